@@ -1,4 +1,6 @@
 from __future__ import absolute_import, print_function
-from .executor import match
+from .pattern import CODEGEN, IGNORECASE, Pattern, cache_memory_usage, \
+    cache_stats, compile, match, match_many, purge
 
-__all__ = ['match']
+__all__ = ['CODEGEN', 'IGNORECASE', 'Pattern', 'cache_memory_usage',
+           'cache_stats', 'compile', 'match', 'match_many', 'purge']
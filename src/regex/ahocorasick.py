@@ -0,0 +1,150 @@
+"""Matching alternations of literal words with an Aho-Corasick automaton.
+
+Patterns like ``foo|bar|baz`` with hundreds of words compile into wide
+branches, and the NFA simulation carries a thread per word at every step.
+The Aho-Corasick automaton is a trie of the words with failure links: when
+the next character doesn't continue the current prefix, the automaton falls
+back to the longest suffix of it that is a prefix of some word. Every
+occurrence of every word is found in a single pass over the string.
+
+The transitions through the failure links are cached per node, so after a
+warm up a character costs one dictionary lookup, like in the lazy DFA. Like
+the lazy DFA cache, the cache is thrown away when it grows too large.
+"""
+from __future__ import absolute_import, print_function
+from collections import deque
+import sys
+import threading
+
+
+class Automaton:
+    """An Aho-Corasick automaton for a list of words.
+
+    Example usage:
+
+    .. code: python
+
+      >>> automaton = Automaton(['he', 'she', 'hers'])
+      >>> list(automaton.occurrences('ushers'))
+      [(1, 4), (0, 4), (2, 6)]
+
+    :param words: Non-empty words to look for.
+    :type words: list
+
+    :param max_cached: The number of the cached transitions through the
+      failure links to keep.
+    :type max_cached: int
+
+    """
+    def __init__(self, words, max_cached=10000):
+        self.words = list(words)
+        self.max_length = max(len(word) for word in self.words) \
+            if self.words else 0
+        # Nodes are integers, the root is 0.
+        goto = [{}]
+        outputs = [[]]
+        for index, word in enumerate(self.words):
+            node = 0
+            for c in word:
+                next_node = goto[node].get(c)
+                if next_node is None:
+                    next_node = len(goto)
+                    goto[node][c] = next_node
+                    goto.append({})
+                    outputs.append([])
+                node = next_node
+            outputs[node].append(index)
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for c, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and c not in goto[state]:
+                    state = fail[state]
+                target = goto[state].get(c, 0)
+                fail[child] = target if target != child else 0
+                # The failure node is closer to the root, so its outputs
+                # are shorter words and the longest word stays first.
+                outputs[child].extend(outputs[fail[child]])
+        self._goto = goto
+        self._fail = fail
+        self._outputs = [tuple(output) for output in outputs]
+        self.max_cached = max_cached
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # The complete transitions, the trie edges plus the cached
+        # transitions through the failure links.
+        self._next = [dict(edges) for edges in self._goto]
+        self._cached = 0
+
+    def __len__(self):
+        return len(self._goto)
+
+    def memory_usage(self):
+        """Return the approximate size of the automaton in bytes: the trie,
+        the failure links, the outputs and the transitions cache."""
+        with self._lock:
+            transitions = self._next
+        return (sys.getsizeof(self.words)
+                + sum(sys.getsizeof(word) for word in self.words)
+                + sys.getsizeof(self._goto) + sys.getsizeof(self._fail)
+                + sys.getsizeof(self._outputs) + sys.getsizeof(transitions)
+                + sum(sys.getsizeof(edges) for edges in self._goto)
+                + sum(sys.getsizeof(output) for output in self._outputs)
+                + sum(sys.getsizeof(edges) for edges in transitions))
+
+    def step(self, node, c):
+        """Return the node after reading a character."""
+        next_node = self._next[node].get(c)
+        if next_node is None:
+            state = node
+            while state and c not in self._goto[state]:
+                state = self._fail[state]
+            next_node = self._goto[state].get(c, 0)
+            with self._lock:
+                if self._cached >= self.max_cached:
+                    self._reset()
+                self._next[node][c] = next_node
+                self._cached += 1
+        return next_node
+
+    def occurrences(self, s, start=0, end=None):
+        """Find all the occurrences of the words in a string.
+
+        :param s: A string to search in.
+        :type s: str
+
+        :param start: Where to start the search.
+        :type start: int
+
+        :param end: Where to end the search, the end of the string if None.
+        :type end: int
+
+        :returns: An iterator of ``(index, end)`` tuples, the index of the
+          word in the list and the end of its occurrence. The occurrences
+          are ordered by their ends, the longest word first.
+        :rtype: iterator
+
+        """
+        transitions = self._next
+        outputs = self._outputs
+        step = self.step
+        node = 0
+        if end is None:
+            end = len(s)
+        for i in range(start, end):
+            c = s[i]
+            next_node = transitions[node].get(c)
+            if next_node is None:
+                node = step(node, c)
+                # The cache may have been reset.
+                transitions = self._next
+            else:
+                node = next_node
+            if outputs[node]:
+                for index in outputs[node]:
+                    yield index, i + 1
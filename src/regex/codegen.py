@@ -0,0 +1,298 @@
+"""The code generation backend.
+
+The lazy DFA reads one character per iteration of a Python loop, so for
+long strings its cost is the number of characters times the interpreter
+overhead. This module turns a :py:class:`~regex.dfa.DFA` into the source of
+a Python module specialized for one pattern that moves as much of the work
+as it can into the string methods:
+
+- if every matching string contains one of a few literals, see
+  :py:func:`~required_literals`, the string is searched for them with
+  ``in`` before the DFA runs,
+- a state looping on all but a few characters, like the one for the
+  leading ``.*`` of an unanchored pattern, skips to the next of them with
+  ``str.find``,
+- a state looping on a few characters, like the one for ``[a-z]*``, skips
+  them with ``str.lstrip``.
+
+Every state is a plain dictionary from the characters to the next states.
+All the rejecting final states are the same empty dictionary, ``_dead``,
+and all the accepting ones ``_accept``. The characters the pattern doesn't
+mention and the ones leading to the same state as them aren't stored: a miss
+raises KeyError and the default state is looked up in ``_defaults`` and
+cached in the dictionary. The loop characters of the skipping states aren't
+cached, so a miss starts a skip instead. If a skip turns out shorter than
+:py:data:`SHORT` characters, the character is cached as a loop, so the
+exceptions don't cost more than they save on dense input.
+
+Example of the generated source for ``^ab``:
+
+.. code: python
+
+  _dead = {}
+  _accept = {}
+  s0 = {}
+  s1 = _dead
+  s2 = {}
+  s3 = _accept
+  s0.update({'a': s2})
+  s2.update({'b': s3})
+  _defaults = {id(s0): s1, id(s2): s1}
+  _finds = {}
+  _strips = {}
+  _accepting = frozenset([id(_accept)])
+
+  def match(s, backward=False, _start=s0, _dead=_dead, _accept=_accept):
+      ...
+
+"""
+from __future__ import absolute_import, print_function
+
+from operator import length_hint
+
+BLOCK = 1024  # How many characters are sliced from the string at once.
+MAX_EXITS = 8  # The most characters a state may skip to with str.find.
+SHORT = 64  # Skips shorter than this cache the character instead.
+MAX_LITERALS = 8  # The most required literals checked before the match.
+MAX_LITERAL_LENGTH = 32  # Longer literals are cut to their ends.
+
+_MATCH = '''
+def match(s, backward=False, _start=s0, _dead=_dead, _accept=_accept):
+    if backward:
+%(backward_prefilter)s        it = reversed(s)
+    else:
+%(prefilter)s        it = iter(s)
+    state = _start
+    n = end = len(s)
+    while True:
+        try:
+            for c in it:
+                state = state[c]
+                if state is _dead:
+                    return False
+                if state is _accept:
+                    return True
+            if end == n:
+                return id(state) in _accepting
+            it = iter(s[end:end + %(block)d])
+            end = min(n, end + %(block)d)
+        except KeyError:
+            if state is _dead or state is _accept:
+                return state is _accept
+            key = id(state)
+            exits = _finds.get(key)
+            loop = _strips.get(key)
+            if exits is None and (loop is None or c not in loop):
+                # Concurrent threads may only store the same state.
+                next_state = _defaults[key]
+                state[c] = next_state
+                state = next_state
+                if state is _dead or state is _accept:
+                    return state is _accept
+                continue
+            start = end - length_hint(it)
+            if backward:
+                # The positions count from the end of the string.
+                s = s[::-1]
+                backward = False
+            if exits is not None:
+                i = _find(s, start, exits)
+            else:
+                i = _strip(s, start, loop)
+            if i - start < %(short)d:
+                # Reading the characters costs less than the exceptions.
+                state[c] = state
+            else:
+                it = iter(s[i:i + %(block)d])
+                end = min(n, i + %(block)d)
+'''
+
+
+def _find(s, start, exits):
+    """Return the position of the first of the exit characters in a string
+    or the end of the string. With several exits only a block is searched
+    so that a rare exit doesn't scan the whole string every time."""
+    if len(exits) == 1:
+        position = s.find(exits, start)
+        return len(s) if position < 0 else position
+    end = min(len(s), start + BLOCK)
+    for c in exits:
+        position = s.find(c, start, end)
+        if position >= 0:
+            end = position
+    return end
+
+
+def _strip(s, start, loop):
+    """Return the position of the first character in a string after
+    the start that isn't one of the loop characters."""
+    while True:
+        block = s[start:start + BLOCK]
+        rest = block.lstrip(loop)
+        start += len(block) - len(rest)
+        if rest or not block:
+            return start
+
+
+def _common_suffix(a, b):
+    i = 0
+    while i < min(len(a), len(b)) and a[-1 - i] == b[-1 - i]:
+        i += 1
+    return a[len(a) - i:]
+
+
+def required_literals(dfa):
+    """Find literals one of which every matching string contains.
+
+    Every state gets the longest string all the paths reaching it end with,
+    so a string can only match if it contains the string of an accepting
+    state it reaches. The strings are found by iterating to a fixed point
+    over the transitions on the classes of a single character.
+
+    :param dfa: A fully built DFA.
+    :type dfa: :py:class:`~regex.dfa.DFA`
+
+    :returns: The literals, or an empty tuple if there are none or too many
+      of them to check.
+    :rtype: tuple
+
+    """
+    members = {}
+    for c, class_id in dfa.classes.items():
+        members.setdefault(class_id, []).append(c)
+    incoming = [[] for _ in range(len(dfa))]
+    for state, row in enumerate(dfa.table):
+        if dfa.final[state]:
+            continue
+        for class_id, target in enumerate(row):
+            chars = members.get(class_id, ())
+            incoming[target].append(
+                (state, chars[0] if class_id and len(chars) == 1 else None))
+    # None stands for the states no path has been found to yet.
+    suffixes = [''] + [None] * (len(dfa) - 1)
+    changed = True
+    while changed:
+        changed = False
+        for state in range(1, len(dfa)):
+            suffix = None
+            for source, c in incoming[state]:
+                if suffixes[source] is None:
+                    continue
+                path = '' if c is None else \
+                    (suffixes[source] + c)[-MAX_LITERAL_LENGTH:]
+                suffix = path if suffix is None \
+                    else _common_suffix(suffix, path)
+            if suffix is not None and suffix != suffixes[state]:
+                suffixes[state] = suffix
+                changed = True
+    literals = set(suffix for suffix, accepting in zip(suffixes, dfa.accepting)
+                   if accepting and suffix is not None)
+    if '' in literals:
+        return ()
+    # A string containing a literal contains the ones inside it as well.
+    literals = sorted(literal for literal in literals
+                      if not any(other != literal and other in literal
+                                 for other in literals))
+    return tuple(literals) if len(literals) <= MAX_LITERALS else ()
+
+
+def generate(dfa):
+    """Generate the source of a matching function for a DFA.
+
+    :param dfa: A fully built DFA.
+    :type dfa: :py:class:`~regex.dfa.DFA`
+
+    :returns: The source of a module defining a function named ``match``.
+      It takes a string and whether to read it backward, and returns True
+      if it matches. The module expects the ``_find``, ``_strip`` and
+      ``length_hint`` functions in its globals.
+    :rtype: str
+
+    """
+    members = {}
+    for c, class_id in dfa.classes.items():
+        members.setdefault(class_id, []).append(c)
+    lines = ['_dead = {}', '_accept = {}']
+    for state, (accepting, final) in enumerate(zip(dfa.accepting,
+                                                   dfa.final)):
+        if final:
+            lines.append('s%d = %s' % (
+                state, '_accept' if accepting else '_dead'))
+        else:
+            lines.append('s%d = {}' % state)
+    defaults = []
+    finds = []
+    strips = []
+    for state, row in enumerate(dfa.table):
+        if dfa.final[state]:
+            continue
+        default = row[0]
+        edges = []
+        loop = []
+        for class_id, target in enumerate(row):
+            chars = sorted(members.get(class_id, ()))
+            if target == state != default:
+                loop.extend(chars)
+            elif target != default:
+                edges.extend('%r: s%d' % (c, target) for c in chars)
+        if edges:
+            lines.append('s%d.update({%s})' % (state, ', '.join(edges)))
+        defaults.append('id(s%d): s%d' % (state, default))
+        if default == state and 0 < len(edges) <= MAX_EXITS:
+            exits = ''.join(sorted(
+                c for class_id, target in enumerate(row) if target != state
+                for c in members.get(class_id, ())))
+            finds.append('id(s%d): %r' % (state, exits))
+        elif loop:
+            strips.append('id(s%d): %r' % (state, ''.join(sorted(loop))))
+    lines.append('_defaults = {%s}' % ', '.join(defaults))
+    lines.append('_finds = {%s}' % ', '.join(finds))
+    lines.append('_strips = {%s}' % ', '.join(strips))
+    lines.append('_accepting = frozenset([%s])' % ', '.join(
+        ['id(_accept)'] + [
+            'id(s%d)' % state
+            for state, (accepting, final)
+            in enumerate(zip(dfa.accepting, dfa.final))
+            if accepting and not final]))
+    # The string is only searched for the literals if the DFA survives the
+    # characters the pattern doesn't mention, otherwise it usually stops
+    # much earlier than the search, e.g. for the anchored patterns.
+    literals = () if dfa.final[dfa.table[0][0]] else required_literals(dfa)
+    prefilter = backward_prefilter = ''
+    if literals:
+        prefilter, backward_prefilter = [
+            '        if not (%s):\n            return False\n' % ' or '.join(
+                '%r in s' % literal[::step] for literal in literals)
+            for step in (1, -1)]
+    return '\n'.join(lines) + '\n' + _MATCH % {
+        'block': BLOCK, 'short': SHORT, 'prefilter': prefilter,
+        'backward_prefilter': backward_prefilter}
+
+
+def build(dfa, name='<regex>'):
+    """Generate a matching function for a DFA and load it.
+
+    :param dfa: A fully built DFA.
+    :type dfa: :py:class:`~regex.dfa.DFA`
+
+    :param name: The file name the generated code is compiled with, it's
+      shown in tracebacks.
+    :type name: str
+
+    :returns: The matching function. Its source is stored in the ``source``
+      attribute, the distinct state dictionaries in ``states``.
+    :rtype: function
+
+    """
+    source = generate(dfa)
+    namespace = {'_find': _find, '_strip': _strip,
+                 'length_hint': length_hint}
+    exec(compile(source, name, 'exec'), namespace)
+    function = namespace['match']
+    function.source = source
+    states = {}
+    for state in range(len(dfa)):
+        dictionary = namespace['s%d' % state]
+        states.setdefault(id(dictionary), dictionary)
+    function.states = list(states.values())
+    return function
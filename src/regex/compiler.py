@@ -75,6 +75,42 @@ def is_disjunction(obj):
     return obj is Disjunction
 
 
+def reverse(pattern):
+    """Reverse the postfix form of a regular expression. The NFA compiled
+    from the result matches the reversed strings the original one
+    matches.
+
+    :param pattern: A list representing the postfix form of
+      a regular expression.
+    :type pattern: list
+
+    :returns: The postfix form of the reversed regular expression.
+    :rtype: list
+
+    Example:
+
+    .. code: python
+
+      >>> reverse(to_postfix('^ab+$'))
+      [Character<b>, Operator<+>, Character<a>, Concatenation]
+
+    """
+    stack = []
+    for token in pattern:
+        if is_character(token):
+            stack.append([token])
+        elif is_concatenation(token):
+            operand_2 = stack.pop()
+            operand_1 = stack.pop()
+            stack.append(operand_2 + operand_1 + [token])
+        elif is_disjunction(token):
+            operand_2 = stack.pop()
+            stack[-1] = stack[-1] + operand_2 + [token]
+        else:
+            stack[-1] = stack[-1] + [token]
+    return stack[-1] if stack else []
+
+
 def compile(pattern):
     """Compile the postfix form of a regular expression to an NFA.
 
@@ -0,0 +1,248 @@
+"""The DFA module.
+
+A DFA state is a set of NFA states. Instead of running the subset
+construction upfront the lazy DFA is built while matching: every transition
+is computed with the NFA simulation the first time it's needed and cached
+afterwards. The cache is safe to share between threads. Reading it doesn't
+take any locks, the building lock is only taken when a transition is
+missing.
+
+When the tables are needed upfront, e.g. for code generation,
+:py:class:`~DFA` runs the whole subset construction over the character
+classes of a pattern.
+"""
+from __future__ import absolute_import, print_function
+import sys
+import threading
+
+from .exceptions import LimitExceeded
+from .tokenizer import Range
+
+
+class DFAState:
+    """A set of NFA states and the transitions computed from it so far.
+    A DFA state is final if the result of the match doesn't depend on the
+    rest of the input: either nothing can match any more or anything
+    does. The latter is the case when the set is accepting and contains
+    an unnegated dot looping back to itself and to the match state, e.g.
+    the trailing ``.*`` added by :py:func:`~regex.tokenizer.add_anchors`.
+
+    :param states: The ids of the NFA states the DFA state represents.
+    :type states: frozenset
+
+    :param program: The NFA program the ids belong to.
+    :type program: :py:class:`~regex.executor.Program`
+
+    """
+    __slots__ = ('states', 'accepting', 'final', 'next')
+
+    def __init__(self, states, program):
+        self.states = states
+        self.accepting = program.match in states
+        self.final = not states or self.accepting and any(
+            program.loops[i] for i in states)
+        self.next = {}
+
+    def __repr__(self):
+        return "DFAState<%s>" % len(self.states)
+
+
+class LazyDFA:
+    """A DFA built on demand from an NFA.
+
+    :param program: A flattened NFA.
+    :type program: :py:class:`~regex.executor.Program`
+
+    :param max_states: The number of DFA states to keep. When the cache grows
+      larger it's thrown away and built again from scratch.
+    :type max_states: int
+
+    """
+    def __init__(self, program, max_states=10000):
+        self.program = program
+        self.max_states = max_states
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        start = DFAState(frozenset(self.program.start), self.program)
+        self._states = {start.states: start}
+        self.start = start
+
+    def __len__(self):
+        return len(self._states)
+
+    def memory_usage(self):
+        """Return the approximate size of the cached DFA states in bytes."""
+        with self._lock:
+            states = list(self._states.values())
+        return sum(sys.getsizeof(state) + sys.getsizeof(state.states)
+                   + sys.getsizeof(state.next) for state in states)
+
+    def step(self, state, c):
+        """Return the DFA state after reading a character."""
+        next_state = state.next.get(c)
+        if next_state is None:
+            next_state = self._add(state, c)
+        return next_state
+
+    def _add(self, state, c):
+        states = self.program.step(state.states, c)
+        with self._lock:
+            next_state = state.next.get(c)
+            if next_state is not None:
+                # Another thread was faster.
+                return next_state
+            if len(self._states) >= self.max_states:
+                self._reset()
+            next_state = self._states.get(states)
+            if next_state is None:
+                next_state = DFAState(states, self.program)
+                self._states[states] = next_state
+            state.next[c] = next_state
+        return next_state
+
+    def run(self, state, s):
+        """Read a string starting from the given DFA state.
+
+        :returns: The DFA state after reading the string. If a final state
+          is reached the rest of the string is skipped.
+        :rtype: :py:class:`~DFAState`
+
+        """
+        if state.final:
+            return state
+        for c in s:
+            next_state = state.next.get(c)
+            if next_state is None:
+                next_state = self._add(state, c)
+            if next_state.final:
+                return next_state
+            state = next_state
+        return state
+
+    def match(self, s):
+        """Run the DFA over a string.
+
+        :returns: True if the DFA ends up in an accepting state.
+        :rtype: bool
+
+        """
+        return self.run(self.start, s).accepting
+
+
+def _matches_unmentioned(token):
+    """Whether a token matches characters the pattern doesn't mention."""
+    if isinstance(token, Range):
+        return token.caret
+    return token.dot != token.caret
+
+
+def character_classes(program):
+    """Split the alphabet into classes of characters matched by the same
+    tokens. All the characters the pattern doesn't mention explicitly fall
+    into the class 0.
+
+    :param program: A flattened NFA.
+    :type program: :py:class:`~regex.executor.Program`
+
+    :returns: A tuple of a dictionary mapping characters to their class ids
+      and a list of the sets of the state ids matching the characters of
+      every class. Characters of the class 0 aren't in the dictionary.
+    :rtype: tuple
+
+    """
+    tokens = [(i, token) for i, token in enumerate(program.tokens)
+              if token is not None]
+    mentioned = set()
+    for _, token in tokens:
+        if isinstance(token, Range):
+            mentioned.update(token.chars)
+        elif not token.dot:
+            mentioned.add(token.c)
+    other = frozenset(i for i, token in tokens
+                      if _matches_unmentioned(token))
+    ids = {other: 0}
+    classes = {}
+    for c in sorted(mentioned):
+        signature = frozenset(i for i, token in tokens if token == c)
+        class_id = ids.setdefault(signature, len(ids))
+        if class_id:
+            classes[c] = class_id
+    members = sorted(ids, key=ids.get)
+    return classes, members
+
+
+class DFA:
+    """A DFA fully built from an NFA by the subset construction. The
+    transitions are made on the character classes rather than on the
+    characters, see :py:func:`~character_classes`. The state 0 is the
+    starting one.
+
+    :param program: A flattened NFA.
+    :type program: :py:class:`~regex.executor.Program`
+
+    :param max_states: The maximum number of the DFA states.
+    :type max_states: int
+
+    :raises: :py:class:`~regex.exceptions.LimitExceeded` if the DFA has more
+      than ``max_states`` states.
+
+    """
+    def __init__(self, program, max_states=1000):
+        self.classes, members = character_classes(program)
+        self.nclasses = len(members)
+        closures = program.closures
+        start = frozenset(program.start)
+        ids = {start: 0}
+        queue = [start]
+        # Transitions, one row of class ids per state.
+        self.table = []
+        while len(self.table) < len(queue):
+            states = queue[len(self.table)]
+            row = []
+            for matching in members:
+                next_states = set()
+                for i in states:
+                    if i in matching:
+                        next_states.update(closures[i])
+                next_states = frozenset(next_states)
+                next_id = ids.get(next_states)
+                if next_id is None:
+                    if len(queue) >= max_states:
+                        raise LimitExceeded(
+                            'The DFA has more than %d states' % max_states)
+                    next_id = ids[next_states] = len(queue)
+                    queue.append(next_states)
+                row.append(next_id)
+            self.table.append(row)
+        states = [DFAState(states, program) for states in queue]
+        self.accepting = [state.accepting for state in states]
+        self.final = [state.final for state in states]
+
+    def __len__(self):
+        return len(self.table)
+
+    def memory_usage(self):
+        """Return the approximate size of the DFA tables in bytes."""
+        return (sys.getsizeof(self.table)
+                + sum(sys.getsizeof(row) for row in self.table)
+                + sys.getsizeof(self.classes) + sys.getsizeof(self.accepting)
+                + sys.getsizeof(self.final))
+
+    def match(self, s):
+        """Run the DFA over a string.
+
+        :returns: True if the DFA ends up in an accepting state.
+        :rtype: bool
+
+        """
+        classes = self.classes
+        table = self.table
+        final = self.final
+        state = 0
+        for c in s:
+            if final[state]:
+                break
+            state = table[state][classes.get(c, 0)]
+        return self.accepting[state]
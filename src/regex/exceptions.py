@@ -5,3 +5,9 @@ class MalformedRegex(Exception):
     """Exception to be raise when the library can't parse
     a regular expression."""
     pass
+
+
+class LimitExceeded(Exception):
+    """Exception to be raised when a pattern is too large to compile or
+    a match runs out of its step budget or time."""
+    pass
@@ -1,25 +1,145 @@
 """The main API module. """
 from __future__ import absolute_import, print_function
-from .compiler import State, SplitState, Match, compile
+import sys
+
+from .compiler import SplitState, Match, compile
+from .optimizer import optimize, reachable
 from .tokenizer import to_postfix
 
 
-def update_states(current_states, state):
-    if state in current_states:
-        return
-    elif isinstance(state, State) or state is Match:
-        current_states.add(state)
-    elif isinstance(state, SplitState):
-        update_states(current_states, state.outs[0])
-        update_states(current_states, state.outs[1])
+def closure(state):
+    """Follow split states from a state and return the character states
+    and the match state reached.
+
+    :rtype: list
+
+    """
+    seen = set()
+    result = []
+    stack = [state]
+    while stack:
+        state = stack.pop()
+        if state is None or state in seen:
+            continue
+        seen.add(state)
+        if isinstance(state, SplitState):
+            stack.extend(reversed(state.outs))
+        else:
+            result.append(state)
+    return result
+
+
+def token_size(token):
+    """Return the approximate size of a character token in bytes. For
+    ranges that's mostly the size of the set of their characters."""
+    size = sys.getsizeof(token) + sys.getsizeof(token.__dict__)
+    chars = getattr(token, 'chars', None)
+    if chars is not None:
+        size += sys.getsizeof(chars) + sum(sys.getsizeof(c) for c in chars)
+    return size
+
+
+class Program:
+    """An NFA flattened into lists indexed by integer state ids. Split
+    states don't get ids, the closure over them is computed once for every
+    state and stored as a tuple of ids.
+
+    :param start: The starting state of an NFA.
+    :type start: :py:class:`~regex.compiler.State`
+
+    """
+    def __init__(self, start):
+        states = [state for state in reachable(start)
+                  if not isinstance(state, SplitState) and state is not Match]
+        states.append(Match)
+        ids = {state: i for i, state in enumerate(states)}
+        self.match = ids[Match]
+        # Character tokens, None for the match state.
+        self.tokens = [None if state is Match else state.c
+                       for state in states]
+        # Ids of the states reached after reading a character.
+        self.closures = [
+            () if state is Match
+            else tuple(ids[s] for s in closure(state.outs[0]))
+            for state in states
+        ]
+        self.start = tuple(ids[s] for s in closure(start))
+        # Whether a state is an unnegated dot looping back to itself and to
+        # the match state, so anything is accepted once the match state is
+        # active too.
+        self.loops = [
+            token is not None and token.dot and not token.caret
+            and i in self.closures[i] and self.match in self.closures[i]
+            for i, token in enumerate(self.tokens)
+        ]
 
+    def __len__(self):
+        return len(self.tokens)
 
-def make_step(current_states, c):
-    new_states = set()
-    for state in current_states:
-        if state is not Match and state.c == c:
-            update_states(new_states, state.outs[0])
-    return new_states
+    def memory_usage(self):
+        """Return the approximate size of the program lists in bytes. The
+        character tokens aren't counted, see :py:func:`~token_size`."""
+        return (sys.getsizeof(self.tokens) + sys.getsizeof(self.closures)
+                + sum(sys.getsizeof(closure) for closure in self.closures)
+                + sys.getsizeof(self.start) + sys.getsizeof(self.loops))
+
+    def step(self, ids, c):
+        """Return the ids of the states active after reading a character
+        in the given states.
+
+        :rtype: frozenset
+
+        """
+        tokens = self.tokens
+        closures = self.closures
+        result = set()
+        for i in ids:
+            if i != self.match and tokens[i] == c:
+                result.update(closures[i])
+        return frozenset(result)
+
+    def run(self, s):
+        """Simulate the NFA over a string.
+
+        The active states are kept in two dense lists swapped on every step.
+        A state is in the current list if its stamp equals the current
+        generation, so the loop doesn't allocate or hash anything.
+
+        :param s: A string to match.
+        :type s: str
+
+        :returns: True if matches, False otherwise.
+        :rtype: bool
+
+        """
+        n = len(self.tokens)
+        tokens = self.tokens
+        closures = self.closures
+        current = [0] * n
+        following = [0] * n
+        stamps = [0] * n
+        generation = 1
+        count = 0
+        for i in self.start:
+            stamps[i] = generation
+            current[count] = i
+            count += 1
+        for c in s:
+            generation += 1
+            new_count = 0
+            for k in range(count):
+                i = current[k]
+                if tokens[i] == c:
+                    for j in closures[i]:
+                        if stamps[j] != generation:
+                            stamps[j] = generation
+                            following[new_count] = j
+                            new_count += 1
+            current, following = following, current
+            count = new_count
+            if not count:
+                return False
+        return stamps[self.match] == generation
 
 
 def match(pattern, s):
@@ -39,11 +159,5 @@ def match(pattern, s):
 
     """
     postfix = to_postfix(pattern)
-    state = compile(postfix)
-    current_states = set()
-    update_states(current_states, state)
-
-    for c in s:
-        current_states = make_step(current_states, c)
-
-    return Match in current_states
+    program = Program(optimize(compile(postfix)).start)
+    return program.run(s)
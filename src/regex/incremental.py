@@ -0,0 +1,183 @@
+"""Incremental matching of edited text.
+
+The text is kept in chunks of about the same length and the matcher records
+the DFA state at the start of every chunk. An edit replaces the chunks it
+touches and rescans them from the state recorded before them. Past the
+edited region the scan goes on chunk by chunk, and as soon as the state at
+a chunk start is the same as in the previous scan, the rest of the text is
+known to end up in the same state too. The chunk positions after the edit
+are shifted lazily. So an edit costs time proportional to the edited region
+and the chunk length, not to the length of the text.
+"""
+from __future__ import absolute_import, print_function
+
+from .pattern import Pattern, compile
+
+
+def _same(state_1, state_2):
+    # The DFA cache may be rebuilt, so equal states aren't always the same
+    # objects.
+    return state_1 is state_2 or state_1.states == state_2.states
+
+
+class IncrementalMatcher:
+    """Match a text against a pattern and keep the result up to date while
+    the text is edited.
+
+    Example usage:
+
+    .. code: python
+
+      >>> matcher = IncrementalMatcher('^[a-z ]+$', 'hello world')
+      >>> matcher.matched
+      True
+      >>> matcher.edit(5, 6, '!')
+      False
+
+    :param pattern: A POSIX-like regular expression or a compiled pattern.
+    :type pattern: str or :py:class:`~regex.pattern.Pattern`
+
+    :param text: The text to match.
+    :type text: str
+
+    :param interval: The length of the chunks the text is kept in.
+    :type interval: int
+
+    """
+    def __init__(self, pattern, text, interval=4096):
+        if not isinstance(pattern, Pattern):
+            pattern = compile(pattern)
+        self.pattern = pattern
+        self.interval = interval
+        self.scanned = 0  # Characters scanned by the last update.
+        self._dfa = pattern._dfa
+        self._chunks = ['']
+        self._states = [self._dfa.start]
+        # The chunk start positions. The positions from the index
+        # ``_shift_from`` on are off by ``_shift``, the length change of
+        # the edits they haven't been updated for.
+        self._positions = [0]
+        self._shift_from = 1
+        self._shift = 0
+        self._length = len(text)
+        self._final = self._dfa.start
+        self._update(0, 0, text)
+
+    @property
+    def matched(self):
+        """Whether the current text matches the pattern."""
+        return self._final.accepting
+
+    @property
+    def text(self):
+        """The current text. It's joined from the chunks on every access."""
+        return ''.join(self._chunks)
+
+    def __len__(self):
+        return self._length
+
+    def _position(self, index):
+        position = self._positions[index]
+        return position + self._shift if index >= self._shift_from \
+            else position
+
+    def _find(self, position, strict=False):
+        """Return the index of the last chunk starting before or at
+        a position, or strictly before it."""
+        low, high = 0, len(self._positions)
+        while high - low > 1:
+            middle = (low + high) // 2
+            start = self._position(middle)
+            if start < position or (start == position and not strict):
+                low = middle
+            else:
+                high = middle
+        return low
+
+    def _move(self, last, delta):
+        """Shift the positions of the chunks after ``last`` by ``delta``.
+        Only the positions between ``last`` and the pending shift are
+        updated, the pending shift absorbs the rest."""
+        positions = self._positions
+        if self._shift_from <= last:
+            if self._shift:
+                for i in range(self._shift_from, last + 1):
+                    positions[i] += self._shift
+            self._shift_from = last + 1
+        if self._shift:
+            for i in range(last + 1, self._shift_from):
+                positions[i] += delta
+        else:
+            self._shift_from = last + 1
+        self._shift += delta
+
+    def _update(self, first, last, region):
+        """Replace the chunks from ``first`` to ``last`` with a region of
+        text and rescan it and as many chunks after it as needed."""
+        interval = self.interval
+        dfa = self._dfa
+        pieces = [region[i:i + interval]
+                  for i in range(0, len(region), interval)] or ['']
+        state = self._states[first]
+        position = self._position(first)
+        states = []
+        positions = []
+        scanned = 0
+        for piece in pieces:
+            states.append(state)
+            positions.append(position)
+            if not state.final:
+                state = dfa.run(state, piece)
+                scanned += len(piece)
+            position += len(piece)
+        self._chunks[first:last + 1] = pieces
+        self._states[first:last + 1] = states
+        self._positions[first:last + 1] = positions
+        self._shift_from += len(pieces) - (last + 1 - first)
+        chunks = self._chunks
+        i = first + len(pieces)
+        while i < len(chunks):
+            if _same(state, self._states[i]):
+                # The rest of the text ends up in the same state.
+                self.scanned = scanned
+                return
+            if state.final:
+                # The rest of the text doesn't change the result.
+                self._states[i:] = [state] * (len(chunks) - i)
+                break
+            self._states[i] = state
+            state = dfa.run(state, chunks[i])
+            scanned += len(chunks[i])
+            i += 1
+        self.scanned = scanned
+        self._final = state
+
+    def edit(self, start, end, replacement):
+        """Replace ``text[start:end]`` with a string and match the new text.
+
+        :param start: The start of the replaced part of the text.
+        :type start: int
+
+        :param end: The end of the replaced part of the text.
+        :type end: int
+
+        :param replacement: The new text for the replaced part.
+        :type replacement: str
+
+        :returns: True if the new text matches, False otherwise.
+        :rtype: bool
+
+        """
+        start = max(0, min(start, self._length))
+        end = max(start, min(end, self._length))
+        first = self._find(start)
+        last = max(first, self._find(end, strict=True))
+        offset = self._position(first)
+        region = ''.join(self._chunks[first:last + 1])
+        region = region[:start - offset] + replacement \
+            + region[end - offset:]
+        delta = len(replacement) - (end - start)
+        self._move(last, delta)
+        self._length += delta
+        self._update(first, last, region)
+        return self.matched
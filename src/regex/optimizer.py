@@ -0,0 +1,262 @@
+"""The NFA optimizer module.
+
+The compiler emits a raw Thompson graph: every ``|``, ``*``, ``+`` and ``?``
+adds a :py:class:`~regex.compiler.SplitState` and literal alternations like
+``foo|foobar|food`` repeat their shared prefixes. The optimizer rebuilds the
+graph so that
+
+- epsilon-only chains of split states disappear,
+- nested split states become a single n-way branch,
+- branches of a split reading the same token are merged when the split is
+  their only predecessor, which factors common prefixes of alternations
+  into a trie,
+- unreachable states and states that can't lead to a match are dropped.
+
+The original graph is never modified.
+"""
+from __future__ import absolute_import, print_function
+from collections import namedtuple
+
+from .compiler import State, SplitState, Match
+from .exceptions import LimitExceeded
+from .tokenizer import Range
+
+
+Optimized = namedtuple('Optimized', ['start', 'states_before', 'states_after'])
+
+
+def token_key(token):
+    """Return a hashable key identifying what a character token matches.
+    Two tokens with equal keys match exactly the same characters."""
+    if isinstance(token, Range):
+        return (Range, frozenset(token.chars), token.caret)
+    return (State, token.c, token.caret, token.dot)
+
+
+def is_dead_token(token):
+    """Whether a token can never match any character, e.g. ``[]``
+    or ``^.``."""
+    if isinstance(token, Range):
+        return not token.chars and not token.caret
+    return token.dot and token.caret
+
+
+def reachable(start):
+    """Return all the states reachable from the start state in the
+    depth-first order, the start state first.
+
+    :param start: The starting state of an NFA.
+    :type start: :py:class:`~regex.compiler.State`
+
+    :rtype: list
+
+    """
+    seen = set()
+    result = []
+    stack = [start]
+    while stack:
+        state = stack.pop()
+        if state is None or state in seen:
+            continue
+        seen.add(state)
+        result.append(state)
+        if state is not Match:
+            stack.extend(reversed(state.outs))
+    return result
+
+
+def count_states(start):
+    """Count the character and split states of an NFA. The match state
+    singleton isn't counted."""
+    return sum(1 for state in reachable(start) if state is not Match)
+
+
+def live_states(states):
+    """Return the subset of states a match is reachable from."""
+    predecessors = {}
+    for state in states:
+        if state is Match:
+            continue
+        if isinstance(state, State) and is_dead_token(state.c):
+            continue
+        for out in state.outs:
+            predecessors.setdefault(out, []).append(state)
+    live = set()
+    stack = [Match]
+    while stack:
+        state = stack.pop()
+        if state in live:
+            continue
+        live.add(state)
+        stack.extend(predecessors.get(state, ()))
+    return live
+
+
+def closure(states, live):
+    """Follow split states from the given states and return a tuple of
+    the live character states and the match state reached, in the order
+    they were found."""
+    seen = set()
+    result = []
+    stack = list(reversed(states))
+    while stack:
+        state = stack.pop()
+        if state in seen or state not in live:
+            continue
+        seen.add(state)
+        if isinstance(state, SplitState):
+            stack.extend(reversed(state.outs))
+        else:
+            result.append(state)
+    return tuple(result)
+
+
+def optimize(start, max_states=None):
+    """Rebuild an NFA into an equivalent smaller one.
+
+    :param start: The starting state of an NFA, the output of
+      :py:func:`~regex.compiler.compile`.
+    :type start: :py:class:`~regex.compiler.State`
+
+    :param max_states: The maximum number of states in the new NFA.
+    :type max_states: int
+
+    :returns: A named tuple with the new starting state and the state counts
+      before and after the optimization.
+    :rtype: :py:class:`~Optimized`
+
+    :raises: :py:class:`~regex.exceptions.LimitExceeded` if the new NFA
+      has more than ``max_states`` states.
+
+    Example:
+
+    .. code: python
+
+      >>> optimize(compile(to_postfix('^foo|foobar|food$')))
+      Optimized(start=State<f> -> ..., states_before=15, states_after=8)
+
+    """
+    live = live_states(reachable(start))
+    copies = {}  # The original character states to their copies.
+    branches = {}  # Closures to the states they are replaced with.
+    pending = []
+    created = [0]
+
+    def add_state():
+        created[0] += 1
+        if max_states is not None and created[0] > max_states:
+            raise LimitExceeded(
+                'The NFA has more than %d states' % max_states)
+
+    def copy(state):
+        if state is Match:
+            return Match
+        node = copies.get(state)
+        if node is None:
+            add_state()
+            node = copies[state] = State(state.c)
+            node.outs.append(None)
+            pending.append((node, state))
+        return node
+
+    def branch(targets):
+        key = frozenset(targets)
+        node = branches.get(key)
+        if node is None:
+            if len(targets) == 1:
+                node = copy(targets[0])
+            else:
+                add_state()
+                node = SplitState()
+                node.outs.extend(copy(state) for state in targets)
+            branches[key] = node
+        return node
+
+    # Collapse the chains of split states, every chain becomes one n-way
+    # branch. Every character state is copied once.
+    new_start = branch(closure([start], live))
+    while pending:
+        node, state = pending.pop()
+        node.outs[0] = branch(closure([state.outs[0]], live))
+
+    new_start = _factor_prefixes(new_start)
+    return Optimized(new_start, count_states(start), count_states(new_start))
+
+
+def _factor_prefixes(start):
+    """Merge the branches of a split state reading the same token into one
+    state followed by a split over their successors. Only the states the
+    split is the only predecessor of are merged, and only if they are the
+    only predecessors of their successor splits. So the merged states form
+    a trie, the other paths through the graph stay as they are and the NFA
+    only gets smaller."""
+    states = reachable(start)
+    predecessors = dict.fromkeys(states, 0)
+    predecessors[start] = 1
+    for state in states:
+        if state is not Match:
+            for out in state.outs:
+                predecessors[out] += 1
+
+    def unlink(node):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            predecessors[node] -= 1
+            if not predecessors[node] and node is not Match:
+                stack.extend(node.outs)
+
+    pending = [state for state in states if isinstance(state, SplitState)]
+    while pending:
+        split = pending.pop()
+        if not predecessors.get(split):
+            continue
+        groups = {}
+        for out in split.outs:
+            if out is Match or predecessors[out] != 1:
+                continue
+            successor = out.outs[0]
+            if isinstance(successor, SplitState) \
+                    and predecessors[successor] != 1:
+                # Merging would copy a split shared with other paths.
+                continue
+            groups.setdefault(token_key(out.c), []).append(out)
+        for group in groups.values():
+            if len(group) < 2:
+                continue
+            targets = []
+            for state in group:
+                out = state.outs[0]
+                for target in (out.outs if isinstance(out, SplitState)
+                               else [out]):
+                    if target not in targets:
+                        targets.append(target)
+            for target in targets:
+                predecessors[target] += 1
+            merged = State(group[0].c)
+            if len(targets) == 1:
+                merged.outs.append(targets[0])
+            else:
+                node = SplitState()
+                node.outs.extend(targets)
+                merged.outs.append(node)
+                predecessors[node] = 1
+                pending.append(node)
+            predecessors[merged] = 1
+            index = split.outs.index(group[0])
+            split.outs[:] = [out for out in split.outs if out not in group]
+            split.outs.insert(index, merged)
+            for state in group:
+                predecessors[state] = 0
+                unlink(state.outs[0])
+
+    def skip(node):
+        # Splits left with a single branch by the merging.
+        while isinstance(node, SplitState) and len(node.outs) == 1:
+            node = node.outs[0]
+        return node
+
+    for state in reachable(start):
+        if state is not Match:
+            state.outs[:] = [skip(out) for out in state.outs]
+    return skip(start)
@@ -0,0 +1,672 @@
+"""Compiled patterns.
+
+A :py:class:`~Pattern` is immutable and can be shared between threads.
+The only state that changes after compilation are the lazily built
+automata and their DFA caches, which do their own locking.
+"""
+from __future__ import absolute_import, print_function
+import codecs
+from concurrent.futures import ThreadPoolExecutor
+import sys
+import threading
+import time
+
+from .ahocorasick import Automaton
+from .codegen import build
+from .compiler import Match, SplitState, compile as compile_nfa, reverse
+from .dfa import DFA, LazyDFA
+from .exceptions import LimitExceeded
+from .executor import Program, token_size
+from .optimizer import optimize, reachable
+from .tokenizer import Character, Concatenation, Operator, Range, \
+    literal_alternatives, split_anchors, to_postfix
+
+
+IGNORECASE = 2  # Match characters regardless of their case.
+CODEGEN = 256  # Match with a Python function generated for the pattern.
+
+_MAXCACHE = 512
+_BLOCK = 4096  # How many characters to match between the limit checks.
+_LINES_BLOCK = 1 << 16  # How many bytes to decode at once in scan_lines.
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+class Pattern:
+    """A compiled regular expression.
+
+    Besides the main automaton a pattern can lazily build the automata for
+    the reversed regular expression. Patterns anchored only at the end are
+    matched backward from the end of the string, so the work is proportional
+    to the matched suffix. The reversed automata are also used by
+    :py:meth:`~Pattern.search` to find where a match starts.
+
+    For alternations of literal words like ``^(GET|POST|PUT)``
+    :py:meth:`~Pattern.match_alternative` finds the matching word with an
+    Aho-Corasick automaton, see :py:mod:`~regex.ahocorasick`. The words are
+    listed in the ``alternatives`` attribute, which is None for the other
+    patterns.
+
+    :param pattern: A POSIX-like regular expression.
+    :type pattern: str
+
+    :param flags: Compilation flags, e.g. :py:data:`~IGNORECASE`. Case
+      folding is done at compile time, the strings are matched as is.
+      With :py:data:`~CODEGEN` the pattern is determinized and matched with
+      a generated function, see :py:mod:`~regex.codegen`. If the DFA turns
+      out to be too large, the lazy DFA is used instead.
+    :type flags: int
+
+    :param max_length: The maximum length of the regular expression. The
+      characters of the square brackets expressions are counted one by one,
+      e.g. ``[a-z]`` adds 26 characters.
+    :type max_length: int
+
+    :param max_states: The maximum number of the NFA states.
+    :type max_states: int
+
+    :raises: :py:class:`~MalformedRegex` if the regular expression is
+      malformed.
+
+    :raises: :py:class:`~LimitExceeded` if the regular expression or its
+      NFA is too large.
+
+    """
+    __slots__ = ('pattern', 'flags', 'nfa', 'states_before', 'states_after',
+                 'alternatives', '_dfa', '_anchors', '_literals', '_derived',
+                 '_length', '_lock')
+
+    def __init__(self, pattern, flags=0, max_length=None, max_states=None):
+        postfix = self._postfix(pattern, flags, max_length=max_length)
+        optimized = optimize(compile_nfa(postfix), max_states)
+        literals = literal_alternatives(postfix)
+        set_attr = super(Pattern, self).__setattr__
+        set_attr('pattern', pattern)
+        set_attr('flags', flags)
+        set_attr('nfa', optimized.start)
+        set_attr('states_before', optimized.states_before)
+        set_attr('states_after', optimized.states_after)
+        set_attr('alternatives', literals and tuple(
+            word for word, _, _ in literals))
+        set_attr('_dfa', LazyDFA(Program(optimized.start)))
+        set_attr('_anchors', split_anchors(pattern)[1:])
+        # The words, their automaton and whether all of them are anchored
+        # at the start and at the end.
+        set_attr('_literals', literals and (
+            tuple(literals), Automaton(self.alternatives),
+            all(start for _, start, _ in literals),
+            all(end for _, _, end in literals)))
+        set_attr('_derived', {})
+        set_attr('_length', len(pattern) + sum(
+            len(token.chars) for token in postfix
+            if isinstance(token, Range)))
+        set_attr('_lock', threading.Lock())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Pattern objects are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Pattern objects are immutable")
+
+    def __repr__(self):
+        if self.flags:
+            return "Pattern<%s, %s>" % (self.pattern, self.flags)
+        return "Pattern<%s>" % self.pattern
+
+    @staticmethod
+    def _postfix(pattern, flags, anchors=True, max_length=None):
+        return to_postfix(pattern, anchors, bool(flags & IGNORECASE),
+                          max_length)
+
+    def _automaton(self, name):
+        """Return one of the lazily built automata:
+
+        - ``reverse`` matches the reversed strings the pattern matches,
+        - ``forward`` matches the strings ending with a match of the pattern
+          without its anchors, or starting with one for ``^`` patterns,
+        - ``reverse_body`` is the reversed pattern without its anchors.
+
+        """
+        dfa = self._derived.get(name)
+        if dfa is not None:
+            return dfa
+        with self._lock:
+            dfa = self._derived.get(name)
+            if dfa is None:
+                if name == 'reverse':
+                    postfix = reverse(self._postfix(self.pattern, self.flags))
+                else:
+                    body = self._postfix(split_anchors(self.pattern)[0],
+                                         self.flags, anchors=False)
+                    if name == 'reverse_body':
+                        postfix = reverse(body)
+                    elif self._anchors[0]:
+                        postfix = body
+                    else:
+                        postfix = [Character('.', dot=True), Operator('*')] \
+                            + body + [Concatenation]
+                # The limits are checked at compile time only, a cached
+                # pattern is shared with the callers that set none.
+                nfa = optimize(compile_nfa(postfix)).start
+                dfa = LazyDFA(Program(nfa))
+                self._derived[name] = dfa
+        return dfa
+
+    def match(self, s, max_steps=None, timeout=None):
+        """Match a string against the pattern.
+
+        :param s: A string to match.
+        :type s: str
+
+        :param max_steps: The maximum number of characters to read.
+        :type max_steps: int
+
+        :param timeout: The maximum time the match may take in seconds.
+        :type timeout: float
+
+        :returns: True if matches, False otherwise.
+        :rtype: bool
+
+        :raises: :py:class:`~LimitExceeded` if the string can't be matched
+          within ``max_steps`` characters or ``timeout`` seconds.
+
+        """
+        backward = self._anchors == (False, True)
+        if max_steps is None and timeout is None:
+            if self.flags & CODEGEN:
+                matcher = self._derived.get(
+                    'codegen_reverse' if backward else 'codegen')
+                if matcher is None:
+                    matcher = self._generated(backward)
+                if matcher:
+                    return matcher(s, backward)
+            dfa = self._automaton('reverse') if backward else self._dfa
+            return dfa.run(dfa.start, reversed(s) if backward else s) \
+                .accepting
+        dfa = self._automaton('reverse') if backward else self._dfa
+        return self._match_limited(dfa, s, backward, max_steps, timeout)
+
+    def match_alternative(self, s):
+        """Match a string against an alternation of literal words and tell
+        which word matched and where, in a single pass over the string. Of
+        all the matching occurrences the one that ends first is found. If
+        there are several, the longest word.
+
+        :param s: A string to match.
+        :type s: str
+
+        :returns: An ``(index, start, end)`` tuple, the index of the word in
+          ``alternatives`` and the position of its occurrence, or None if
+          the string doesn't match.
+        :rtype: tuple
+
+        :raises: ValueError if the pattern isn't an alternation of literal
+          words.
+
+        Example:
+
+        .. code: python
+
+          >>> compile('^(GET|POST|PUT)').match_alternative('POST /')
+          (1, 0, 4)
+
+        """
+        if not self._literals:
+            raise ValueError(
+                '%r is not an alternation of literal words' % self.pattern)
+        literals, automaton, all_start, all_end = self._literals
+        n = len(s)
+        # Anchored words can only occur within their length from the
+        # anchor, so the rest of the string isn't scanned.
+        first = max(0, n - automaton.max_length) if all_end else 0
+        last = min(n, automaton.max_length) if all_start else n
+        for index, end in automaton.occurrences(s, first, last):
+            word, start_anchored, end_anchored = literals[index]
+            start = end - len(word)
+            if (start == 0 or not start_anchored) \
+                    and (end == n or not end_anchored):
+                return index, start, end
+        return None
+
+    def _determinized(self, backward=False, max_states=None):
+        """Return the fully built DFA of the pattern or of the reversed
+        pattern, or False if the DFA has more than ``max_states`` states,
+        the default limit of :py:class:`~regex.dfa.DFA` if it's None."""
+        name = 'dfa_reverse' if backward else 'dfa'
+        dfa = self._derived.get(name)
+        if dfa is None:
+            try:
+                dfa = DFA(self._nfa_program(backward))
+            except LimitExceeded:
+                dfa = False
+            with self._lock:
+                dfa = self._derived.setdefault(name, dfa)
+        if max_states is None:
+            return dfa
+        if dfa:
+            return dfa if len(dfa) <= max_states else False
+        # Only the DFA within the default limit is cached, the larger ones
+        # are built for a one time export.
+        try:
+            return DFA(self._nfa_program(backward), max_states)
+        except LimitExceeded:
+            return False
+
+    def _nfa_program(self, backward):
+        lazy_dfa = self._automaton('reverse') if backward else self._dfa
+        return lazy_dfa.program
+
+    def _generated(self, backward):
+        """Return the generated matching function or False if the DFA is
+        too large for it."""
+        name = 'codegen_reverse' if backward else 'codegen'
+        matcher = self._derived.get(name)
+        if matcher is not None:
+            return matcher
+        dfa = self._determinized(backward)
+        matcher = dfa and build(dfa, '<regex %r>' % self.pattern)
+        with self._lock:
+            return self._derived.setdefault(name, matcher)
+
+    def _match_limited(self, dfa, s, backward, max_steps, timeout):
+        # The string is matched block by block and the limits are checked
+        # between the blocks, so the per character loop stays the same.
+        deadline = None if timeout is None else time.monotonic() + timeout
+        state = dfa.start
+        n = len(s)
+        steps = 0
+        while steps < n and not state.final:
+            if max_steps is not None and steps >= max_steps:
+                raise LimitExceeded(
+                    'The match needs more than %d steps' % max_steps)
+            if deadline is not None and time.monotonic() >= deadline:
+                raise LimitExceeded(
+                    'The match takes longer than %s seconds' % timeout)
+            size = min(_BLOCK, n - steps)
+            if max_steps is not None:
+                size = min(size, max_steps - steps)
+            if backward:
+                block = s[n - steps - size:n - steps][::-1]
+            else:
+                block = s[steps:steps + size]
+            state = dfa.run(state, block)
+            steps += size
+        return state.accepting
+
+    def scan_lines(self, buffer, offsets=False, encoding='utf-8'):
+        """Match every line of a buffer against the pattern in one pass.
+
+        The buffer isn't split into lines, the DFA is reset to its start
+        state at every newline instead. Every line is matched as a whole
+        string, so ``^`` and ``$`` anchor the pattern to the line start and
+        end.
+
+        :param buffer: The text to scan.
+        :type buffer: str or bytes
+
+        :param offsets: Whether to return the offsets of the matching lines
+          starts instead of their numbers. The offsets index the buffer, so
+          they are counted in bytes for a bytes buffer.
+        :type offsets: bool
+
+        :param encoding: The encoding of a bytes buffer. The buffer is
+          decoded block by block, the newline must be the ``b'\\n'`` byte
+          as in UTF-8 and the other ASCII compatible encodings.
+        :type encoding: str
+
+        :returns: The numbers of the matching lines, counted from 1, or their
+          offsets.
+        :rtype: list
+
+        Example:
+
+        .. code: python
+
+          >>> compile('^b').scan_lines('abc\nbcd\nbar\n')
+          [2, 3]
+
+        """
+        if not isinstance(buffer, bytes):
+            lines = self._scan_lines([buffer])
+            return [line_start if offsets else lineno
+                    for lineno, line_start in lines]
+        decoder = codecs.getincrementaldecoder(encoding)()
+        view = memoryview(buffer)
+        blocks = (decoder.decode(view[i:i + _LINES_BLOCK],
+                                 final=i + _LINES_BLOCK >= len(buffer))
+                  for i in range(0, len(buffer), _LINES_BLOCK))
+        linenos = [lineno for lineno, _ in self._scan_lines(blocks)]
+        if not offsets:
+            return linenos
+        result = []
+        lineno = 1
+        line_start = 0
+        for target in linenos:
+            while lineno < target:
+                line_start = buffer.index(b'\n', line_start) + 1
+                lineno += 1
+            result.append(line_start)
+        return result
+
+    def _scan_lines(self, blocks):
+        """Yield the numbers and the offsets of the matching lines of a text
+        split into blocks."""
+        dfa = self._dfa
+        start = state = dfa.start
+        lineno = 1
+        line_start = 0
+        offset = 0
+        for block in blocks:
+            for i, c in enumerate(block, offset):
+                if c == '\n':
+                    if state.accepting:
+                        yield lineno, line_start
+                    state = start
+                    lineno += 1
+                    line_start = i + 1
+                elif not state.final:
+                    next_state = state.next.get(c)
+                    if next_state is None:
+                        next_state = dfa.step(state, c)
+                    state = next_state
+            offset += len(block)
+        if line_start < offset and state.accepting:
+            yield lineno, line_start
+
+    def stats(self):
+        """Report the size of the pattern and of everything built for it
+        so far. The sizes in bytes are approximate, they are measured with
+        :py:func:`sys.getsizeof`.
+
+        :returns: A dictionary with the following keys:
+
+          - ``nfa_states``: the number of the NFA states,
+          - ``split_states``: how many of them are split states,
+          - ``split_ratio``: the share of the split states,
+          - ``nfa_bytes``: the size of the NFA graph and programs,
+          - ``class_bytes``: the size of the character tokens, mostly the
+            sets of the range characters,
+          - ``dfa_states``: the number of the cached lazy DFA states,
+          - ``dfa_cache_bytes``: their size,
+          - ``dfa_table_bytes``: the size of the fully built DFA tables
+            and the generated code,
+          - ``literal_bytes``: the size of the Aho-Corasick automaton of
+            a literal alternation,
+          - ``total_bytes``: the sum of the sizes.
+
+        :rtype: dict
+
+        """
+        with self._lock:
+            derived = list(self._derived.values())
+        lazy_dfas = [self._dfa] + [d for d in derived
+                                   if isinstance(d, LazyDFA)]
+        states = [s for s in reachable(self.nfa) if s is not Match]
+        nsplit = sum(1 for s in states if isinstance(s, SplitState))
+        nfa_bytes = sum(sys.getsizeof(s) + sys.getsizeof(s.__dict__)
+                        + sys.getsizeof(s.outs) for s in states)
+        tokens = {}
+        for dfa in lazy_dfas:
+            nfa_bytes += dfa.program.memory_usage()
+            for token in dfa.program.tokens:
+                if token is not None:
+                    tokens[id(token)] = token
+        class_bytes = sum(token_size(token) for token in tokens.values())
+        dfa_cache_bytes = sum(dfa.memory_usage() for dfa in lazy_dfas)
+        dfa_table_bytes = 0
+        for item in derived:
+            if isinstance(item, DFA):
+                dfa_table_bytes += item.memory_usage()
+            elif callable(item):
+                # Generated matching functions.
+                dfa_table_bytes += sys.getsizeof(item.source) + sum(
+                    sys.getsizeof(state) for state in item.states)
+        literal_bytes = 0
+        if self._literals:
+            literal_bytes = sys.getsizeof(self._literals[0]) \
+                + self._literals[1].memory_usage()
+        return {
+            'nfa_states': len(states),
+            'split_states': nsplit,
+            'split_ratio': float(nsplit) / len(states) if states else 0.0,
+            'nfa_bytes': nfa_bytes,
+            'class_bytes': class_bytes,
+            'dfa_states': sum(len(dfa) for dfa in lazy_dfas),
+            'dfa_cache_bytes': dfa_cache_bytes,
+            'dfa_table_bytes': dfa_table_bytes,
+            'literal_bytes': literal_bytes,
+            'total_bytes': nfa_bytes + class_bytes + dfa_cache_bytes
+            + dfa_table_bytes + literal_bytes,
+        }
+
+    def memory_usage(self):
+        """Return the approximate size of the pattern in bytes, see
+        :py:meth:`~Pattern.stats`."""
+        return self.stats()['total_bytes']
+
+    def search(self, s):
+        """Find a substring matching the pattern. Of all the matching
+        substrings the one that ends first is found. If there are several,
+        the longest one.
+
+        :param s: A string to search in.
+        :type s: str
+
+        :returns: A ``(start, end)`` tuple of the match position or None if
+          nothing matches.
+        :rtype: tuple
+
+        Example:
+
+        .. code: python
+
+          >>> compile('b+c').search('abbbcd')
+          (1, 5)
+
+        """
+        start_anchored, end_anchored = self._anchors
+        if not split_anchors(self.pattern)[0]:
+            # An empty pattern matches the empty string.
+            if start_anchored and end_anchored and s:
+                return None
+            return (len(s), len(s)) if end_anchored else (0, 0)
+        if end_anchored:
+            end = len(s)
+            if start_anchored:
+                return (0, end) if self._dfa.match(s) else None
+        else:
+            end = self._find_end(s)
+            if end is None:
+                return None
+            if start_anchored:
+                return (0, end)
+        start = self._find_start(s, end)
+        return None if start is None else (start, end)
+
+    def _find_end(self, s):
+        dfa = self._automaton('forward')
+        state = dfa.start
+        if state.accepting:
+            return 0
+        for i, c in enumerate(s, 1):
+            state = dfa.step(state, c)
+            if state.accepting:
+                return i
+            if not state.states:
+                return None
+        return None
+
+    def _find_start(self, s, end):
+        dfa = self._automaton('reverse_body')
+        state = dfa.start
+        start = end if state.accepting else None
+        for i in range(end - 1, -1, -1):
+            state = dfa.step(state, s[i])
+            if not state.states:
+                break
+            if state.accepting:
+                start = i
+        return start
+
+    def _match_all(self, strings):
+        match = self.match
+        return [match(s) for s in strings]
+
+
+def _check_length(length, max_length):
+    if max_length is not None and length > max_length:
+        raise LimitExceeded(
+            'The regular expression is longer than %d characters'
+            % max_length)
+
+
+def compile(pattern, flags=0, max_length=None, max_states=None):
+    """Compile a regular expression or get it from the cache.
+
+    :param pattern: A POSIX-like regular expression.
+    :type pattern: str
+
+    :param flags: Compilation flags, e.g. :py:data:`~IGNORECASE`.
+    :type flags: int
+
+    :param max_length: The maximum length of the regular expression with
+      the characters of its square brackets expressions counted one by one,
+      see :py:class:`~Pattern`.
+    :type max_length: int
+
+    :param max_states: The maximum number of the NFA states.
+    :type max_states: int
+
+    :rtype: :py:class:`~Pattern`
+
+    :raises: :py:class:`~MalformedRegex` if the regular expression is
+      malformed.
+
+    :raises: :py:class:`~LimitExceeded` if the regular expression or its
+      NFA is too large.
+
+    """
+    key = (pattern, flags)
+    compiled = _cache.get(key)
+    if compiled is not None:
+        _check_length(compiled._length, max_length)
+        if max_states is not None and compiled.states_after > max_states:
+            raise LimitExceeded(
+                'The NFA has more than %d states' % max_states)
+        return compiled
+    compiled = Pattern(pattern, flags, max_length, max_states)
+    with _cache_lock:
+        if len(_cache) >= _MAXCACHE:
+            _cache.clear()
+        return _cache.setdefault(key, compiled)
+
+
+def purge():
+    """Clear the compiled patterns cache."""
+    with _cache_lock:
+        _cache.clear()
+
+
+def cache_stats():
+    """Sum up the :py:meth:`~Pattern.stats` of the cached patterns.
+
+    :returns: A dictionary with the same keys as :py:meth:`~Pattern.stats`
+      except ``split_ratio``, and ``patterns``, the number of the cached
+      patterns.
+    :rtype: dict
+
+    """
+    with _cache_lock:
+        patterns = list(_cache.values())
+    result = {
+        'patterns': len(patterns),
+        'nfa_states': 0,
+        'split_states': 0,
+        'nfa_bytes': 0,
+        'class_bytes': 0,
+        'dfa_states': 0,
+        'dfa_cache_bytes': 0,
+        'dfa_table_bytes': 0,
+        'literal_bytes': 0,
+        'total_bytes': 0,
+    }
+    for pattern in patterns:
+        for key, value in pattern.stats().items():
+            if key in result:
+                result[key] += value
+    return result
+
+
+def cache_memory_usage():
+    """Return the approximate size of the cached patterns in bytes."""
+    return cache_stats()['total_bytes']
+
+
+def match(pattern, s, flags=0, max_steps=None, timeout=None):
+    """Apply a pattern to a string and return the result of the match.
+
+    :param pattern: A POSIX-like regular expression or a compiled pattern.
+    :type pattern: str or :py:class:`~Pattern`
+
+    :s: A string to match.
+    :type s: str
+
+    :param flags: Compilation flags, ignored for compiled patterns.
+    :type flags: int
+
+    :param max_steps: The maximum number of characters to read.
+    :type max_steps: int
+
+    :param timeout: The maximum time the match may take in seconds.
+    :type timeout: float
+
+    :returns: True if matches, False otherwise.
+    :rtype: bool
+
+    :raises: :py:class:`~MalformedRegex` if the regular expression is
+      malformed.
+
+    :raises: :py:class:`~LimitExceeded` if the match exceeds the limits.
+
+    """
+    if not isinstance(pattern, Pattern):
+        pattern = compile(pattern, flags)
+    return pattern.match(s, max_steps, timeout)
+
+
+def match_many(pattern, strings, threads=None, flags=0):
+    """Match a list of strings against a pattern.
+
+    The strings are split into one batch per thread and matched in
+    a thread pool. The pattern is shared between the threads, so on
+    free-threaded Python builds the batches run on all the cores.
+
+    :param pattern: A POSIX-like regular expression or a compiled pattern.
+    :type pattern: str or :py:class:`~Pattern`
+
+    :param strings: Strings to match.
+    :type strings: iterable
+
+    :param threads: The number of threads. If it's None or 1 the strings are
+      matched in the calling thread.
+    :type threads: int
+
+    :param flags: Compilation flags, ignored for compiled patterns.
+    :type flags: int
+
+    :returns: A list of the match results in the order of the strings.
+    :rtype: list
+
+    """
+    if not isinstance(pattern, Pattern):
+        pattern = compile(pattern, flags)
+    strings = list(strings)
+    if not threads or threads == 1 or len(strings) < 2:
+        return pattern._match_all(strings)
+    size = -(-len(strings) // threads)
+    batches = [strings[i:i + size] for i in range(0, len(strings), size)]
+    result = []
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for batch_result in executor.map(pattern._match_all, batches):
+            result.extend(batch_result)
+    return result
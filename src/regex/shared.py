@@ -0,0 +1,240 @@
+"""Sharing compiled patterns between processes.
+
+A pattern's DFA tables are exported into a flat block of native integers:
+the transition table, the character class map and the accepting and final
+state flags. The block lives in :py:mod:`multiprocessing.shared_memory` or
+in a file. Other processes attach to it read-only and match against the
+tables in place, with no copying and no compilation.
+
+Only the DFA is exported, the NFA tokens are Python objects. Patterns whose
+DFA has more states than the ``max_states`` argument can't be exported.
+Shared memory needs Python 3.8 or later, the files work on any version.
+
+Example usage:
+
+.. code: python
+
+  # The parent process.
+  block = export(compile('^(GET|POST) /api/'), name='api-routes')
+
+  # A worker process.
+  pattern = attach('api-routes')
+  pattern.match('GET /api/users')
+
+"""
+from __future__ import absolute_import, print_function
+from bisect import bisect_left
+import mmap
+import struct
+
+from .exceptions import LimitExceeded
+from .pattern import Pattern, compile
+
+_MAGIC = b'NFAR'
+_VERSION = 1
+# Magic, version, number of states, number of classes, number of mapped
+# characters, pattern length in bytes.
+_HEADER = struct.Struct('=4s5i')
+_ASCII = 128
+
+ACCEPTING = 1
+FINAL = 2
+
+
+def to_bytes(pattern, max_states=None):
+    """Serialize the DFA tables of a pattern.
+
+    :param pattern: A POSIX-like regular expression or a compiled pattern.
+    :type pattern: str or :py:class:`~regex.pattern.Pattern`
+
+    :param max_states: The maximum number of the DFA states, the default
+      limit of :py:class:`~regex.dfa.DFA` if it's None. Every state takes
+      4 bytes per character class.
+    :type max_states: int
+
+    :rtype: bytes
+
+    :raises: :py:class:`~regex.exceptions.LimitExceeded` if the pattern's
+      DFA has more than ``max_states`` states.
+
+    """
+    if not isinstance(pattern, Pattern):
+        pattern = compile(pattern)
+    dfa = pattern._determinized(max_states=max_states)
+    if not dfa:
+        raise LimitExceeded("The pattern's DFA is too large to export")
+    ascii_classes = [dfa.classes.get(chr(i), 0) for i in range(_ASCII)]
+    mapped = sorted((ord(c), class_id) for c, class_id in dfa.classes.items()
+                    if ord(c) >= _ASCII)
+    flags = [ACCEPTING * accepting + FINAL * final
+             for accepting, final in zip(dfa.accepting, dfa.final)]
+    source = pattern.pattern.encode('utf-8')
+    values = (flags + ascii_classes + [code for code, _ in mapped]
+              + [class_id for _, class_id in mapped]
+              + [state for row in dfa.table for state in row])
+    header = _HEADER.pack(_MAGIC, _VERSION, len(dfa), dfa.nclasses,
+                          len(mapped), len(source))
+    return header + struct.pack('=%di' % len(values), *values) + source
+
+
+class SharedPattern:
+    """A read-only pattern matching against serialized DFA tables.
+
+    :param buffer: An object supporting the buffer protocol with the output
+      of :py:func:`~to_bytes`. It's never copied, except for writable
+      buffers on Python < 3.8, which can't be made read-only in place.
+
+    :param owner: An object to keep alive while the pattern is used, e.g.
+      the shared memory block or the memory map the buffer belongs to.
+
+    :raises: ValueError if the buffer doesn't contain pattern tables.
+
+    """
+    def __init__(self, buffer, owner=None):
+        view = memoryview(buffer)
+        if not view.readonly:
+            try:
+                view = view.toreadonly()
+            except AttributeError:  # Python < 3.8.
+                view = memoryview(bytes(view))
+        magic, version, nstates, nclasses, nmapped, nsource = \
+            _HEADER.unpack_from(view)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError('Not a pattern tables buffer')
+        size = nstates + _ASCII + 2 * nmapped + nstates * nclasses
+        end = _HEADER.size + 4 * size
+        values = view[_HEADER.size:end].cast('i')
+        self._owner = owner
+        self._view = view
+        self._flags = values[:nstates]
+        self._ascii = values[nstates:nstates + _ASCII]
+        offset = nstates + _ASCII
+        self._codes = values[offset:offset + nmapped]
+        self._mapped = values[offset + nmapped:offset + 2 * nmapped]
+        self._table = values[offset + 2 * nmapped:]
+        self._nclasses = nclasses
+        self.pattern = bytes(view[end:end + nsource]).decode('utf-8')
+
+    def __repr__(self):
+        return "SharedPattern<%s>" % self.pattern
+
+    def match(self, s):
+        """Match a string against the pattern.
+
+        :param s: A string to match.
+        :type s: str
+
+        :returns: True if matches, False otherwise.
+        :rtype: bool
+
+        """
+        flags = self._flags
+        ascii_classes = self._ascii
+        codes = self._codes
+        mapped = self._mapped
+        ncodes = len(codes)
+        table = self._table
+        nclasses = self._nclasses
+        state = 0
+        if flags[state] & FINAL:
+            return bool(flags[state] & ACCEPTING)
+        for c in s:
+            code = ord(c)
+            if code < _ASCII:
+                class_id = ascii_classes[code]
+            else:
+                i = bisect_left(codes, code)
+                class_id = mapped[i] if i < ncodes and codes[i] == code \
+                    else 0
+            state = table[state * nclasses + class_id]
+            if flags[state] & FINAL:
+                break
+        return bool(flags[state] & ACCEPTING)
+
+    def close(self):
+        """Release the buffer. The pattern can't be used afterwards."""
+        for name in ('_flags', '_ascii', '_codes', '_mapped', '_table'):
+            getattr(self, name).release()
+        self._view.release()
+        if self._owner is not None:
+            self._owner.close()
+            self._owner = None
+
+
+def export(pattern, name=None, max_states=None):
+    """Export the DFA tables of a pattern into a new shared memory block.
+
+    :param pattern: A POSIX-like regular expression or a compiled pattern.
+    :type pattern: str or :py:class:`~regex.pattern.Pattern`
+
+    :param name: The name of the block. A random one is generated if it's
+      None.
+    :type name: str
+
+    :param max_states: The maximum number of the DFA states, see
+      :py:func:`~to_bytes`.
+    :type max_states: int
+
+    :returns: The shared memory block. The caller owns it and should
+      ``unlink`` it when the workers don't need it any more.
+    :rtype: :py:class:`multiprocessing.shared_memory.SharedMemory`
+
+    """
+    from multiprocessing.shared_memory import SharedMemory
+    data = to_bytes(pattern, max_states)
+    block = SharedMemory(name=name, create=True, size=len(data))
+    block.buf[:len(data)] = data
+    return block
+
+
+def attach(name):
+    """Attach to a shared memory block created by :py:func:`~export`.
+
+    :param name: The name of the block.
+    :type name: str
+
+    :rtype: :py:class:`~SharedPattern`
+
+    """
+    from multiprocessing.shared_memory import SharedMemory
+    # The block is owned by the exporting process, the resource tracker
+    # of a worker must not unlink it at exit.
+    try:
+        block = SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13.
+        from multiprocessing import resource_tracker
+        block = SharedMemory(name=name)
+        resource_tracker.unregister(block._name, 'shared_memory')
+    return SharedPattern(block.buf, block)
+
+
+def dump(pattern, path, max_states=None):
+    """Write the DFA tables of a pattern into a file for :py:func:`~load`.
+
+    :param pattern: A POSIX-like regular expression or a compiled pattern.
+    :type pattern: str or :py:class:`~regex.pattern.Pattern`
+
+    :param path: The file path.
+    :type path: str
+
+    :param max_states: The maximum number of the DFA states, see
+      :py:func:`~to_bytes`.
+    :type max_states: int
+
+    """
+    with open(path, 'wb') as f:
+        f.write(to_bytes(pattern, max_states))
+
+
+def load(path):
+    """Memory-map a file written by :py:func:`~dump` read-only.
+
+    :param path: The file path.
+    :type path: str
+
+    :rtype: :py:class:`~SharedPattern`
+
+    """
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return SharedPattern(mapped, mapped)
@@ -0,0 +1,132 @@
+"""asyncio entry points for matching data read from streams.
+
+The sources are either :py:class:`asyncio.StreamReader` objects or async
+iterables of byte or string chunks. The DFA state is carried from one read
+to the next, so lines and matches may span reads.
+
+Matching is CPU-bound, so long texts are matched in slices and the event
+loop gets control back between the slices. Chunks longer than
+``executor_threshold`` characters are matched in the loop's default
+executor instead. That is safe because the DFA cache of a compiled pattern
+is shared between threads.
+"""
+from __future__ import absolute_import, print_function
+import asyncio
+import codecs
+
+from .pattern import Pattern, compile
+
+
+def _as_pattern(pattern):
+    return pattern if isinstance(pattern, Pattern) else compile(pattern)
+
+
+async def _read_chunks(source, chunk_size, encoding):
+    decoder = codecs.getincrementaldecoder(encoding)()
+    if hasattr(source, 'read'):
+        while True:
+            data = await source.read(chunk_size)
+            if not data:
+                break
+            yield data if isinstance(data, str) else decoder.decode(data)
+    else:
+        async for data in source:
+            yield data if isinstance(data, str) else decoder.decode(data)
+    tail = decoder.decode(b'', True)
+    if tail:
+        yield tail
+
+
+async def _run(dfa, state, text, slice_size, executor_threshold):
+    if executor_threshold is not None and len(text) >= executor_threshold:
+        # Called from a coroutine, it's the running loop. Unlike
+        # get_running_loop() it's available on Python 3.6.
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, dfa.run, state, text)
+    for i in range(0, len(text), slice_size):
+        if i:
+            await asyncio.sleep(0)
+        state = dfa.run(state, text[i:i + slice_size])
+        if state.final:
+            break
+    return state
+
+
+async def iter_lines(pattern, source, chunk_size=65536, encoding='utf-8',
+                     slice_size=65536, executor_threshold=None):
+    """Match every line of a stream against a pattern.
+
+    Example usage:
+
+    .. code: python
+
+      reader, writer = await asyncio.open_connection(host, port)
+      async for lineno, line in iter_lines('^ERROR', reader):
+          print(lineno, line)
+
+    :param pattern: A POSIX-like regular expression or a compiled pattern.
+    :type pattern: str or :py:class:`~regex.pattern.Pattern`
+
+    :param source: A stream reader or an async iterable of chunks.
+    :type source: :py:class:`asyncio.StreamReader`
+
+    :param chunk_size: How many bytes to read from a stream reader at once.
+    :type chunk_size: int
+
+    :param encoding: The encoding of byte chunks.
+    :type encoding: str
+
+    :param slice_size: How many characters to match before giving control
+      back to the event loop.
+    :type slice_size: int
+
+    :param executor_threshold: Text longer than this is matched in the
+      default executor. If it's None, the executor isn't used.
+    :type executor_threshold: int
+
+    :returns: An async iterator of ``(line number, line)`` tuples for the
+      matching lines. Lines are counted from 1 and don't include the
+      newline character.
+
+    """
+    dfa = _as_pattern(pattern)._dfa
+    state = dfa.start
+    lineno = 1
+    pieces = []
+    async for text in _read_chunks(source, chunk_size, encoding):
+        lines = text.split('\n')
+        for i, line in enumerate(lines):
+            state = await _run(dfa, state, line, slice_size,
+                               executor_threshold)
+            pieces.append(line)
+            if i == len(lines) - 1:
+                # The line continues in the next chunk.
+                break
+            if state.accepting:
+                yield lineno, ''.join(pieces)
+            state = dfa.start
+            lineno += 1
+            pieces = []
+    if any(pieces) and state.accepting:
+        yield lineno, ''.join(pieces)
+
+
+async def match_stream(pattern, source, chunk_size=65536, encoding='utf-8',
+                       slice_size=65536, executor_threshold=None):
+    """Match the whole content of a stream against a pattern. The content
+    is never kept in memory and the reading stops as soon as the result
+    is known.
+
+    The parameters are the same as for :py:func:`~iter_lines`.
+
+    :returns: True if matches, False otherwise.
+    :rtype: bool
+
+    """
+    dfa = _as_pattern(pattern)._dfa
+    state = dfa.start
+    async for text in _read_chunks(source, chunk_size, encoding):
+        state = await _run(dfa, state, text, slice_size, executor_threshold)
+        if state.final:
+            break
+    return state.accepting
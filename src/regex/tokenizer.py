@@ -2,7 +2,9 @@
 tramsforming regular expressions to their postfix form.
 """
 from __future__ import absolute_import, print_function
-from .exceptions import MalformedRegex
+import threading
+
+from .exceptions import LimitExceeded, MalformedRegex
 
 
 class Character:
@@ -13,7 +15,7 @@ class Character:
     :param c: A character the object represents.
     :type c: str
 
-    :param caret: A flag defining if the character was preceeded by
+    :param caret: A flag defining if the character was preceded by
       the caret. If it is True, the comparison logic will be inverted.
       Say ``c`` is 'a' and ``caret`` is True. Than this token equals anything
       but 'a'.
@@ -57,7 +59,7 @@ class Range(Character):
     the result is True. This consistensy between characters and ranges makes
     implementation of the state machinea lot easier.
 
-    :param caret: Whether the range in the regular expression was preceeded by
+    :param caret: Whether the range in the regular expression was preceded by
       the caret. This inverts the comparison behavior.
     :type caret: bool
 
@@ -110,16 +112,24 @@ class Operator:
         return "Operator<%s>" % self.op
 
 
-def square_brackets_expand(expr):
+def square_brackets_expand(expr, max_size=None):
     """A helper function for expanding expressions in square brackets.
 
     :param expr: A list of characters in square brackets,
       e.g. ['a', '-', 'b']
     :type expr: list
 
+    :param max_size: The maximum number of characters in the expanded
+      expression.
+    :type max_size: int
+
     :returns: The expanded version of the expression.
     :rtype: list
 
+    :raises: :py:class:`~regex.exceptions.LimitExceeded` if the expanded
+      expression has more than ``max_size`` characters. It's raised before
+      the characters are expanded.
+
     Example usage:
 
     .. code: python
@@ -137,6 +147,11 @@ def square_brackets_expand(expr):
         if len(tokens) == 3 and tokens[1] == '-':
             # This is a range like a-z.
             start, end = tokens[0], tokens[2]
+            if max_size is not None \
+                    and len(result) + ord(end) - ord(start) + 1 > max_size:
+                raise LimitExceeded(
+                    'The character class has more than %d characters'
+                    % max_size)
             for i in range(ord(start), ord(end) + 1):
                 result.append(chr(i))
             tokens = []
@@ -151,16 +166,138 @@ def square_brackets_expand(expr):
     return result
 
 
-def make_range(buf):
+def make_range(buf, max_size=None):
     caret = buf[0] == '^'
     range_ = Range(caret)
     buf = buf[1:] if caret else buf
-    chars = square_brackets_expand(buf)
+    chars = square_brackets_expand(buf, max_size)
     for c in chars:
         range_.add_char(c)
     return range_
 
 
+# Characters that are equal under the simple case folding, keyed by every
+# one of them. Built on the first use and published only when complete.
+_case_classes = None
+_case_classes_lock = threading.Lock()
+
+
+def simple_fold(c):
+    """Return the simple case folding of a character, i.e. the one that
+    maps a character to a single character. ``'K'`` is folded to ``'k'``,
+    ``'\u1e9e'`` (the capital sharp s) to ``'\xdf'``."""
+    folded = c.casefold()
+    if len(folded) != 1:
+        folded = c.lower()
+        if len(folded) != 1:
+            folded = c
+    return folded
+
+
+def case_variants(c):
+    """Return all the characters equal to a character when the case is
+    ignored, including the character itself.
+
+    :param c: A character.
+    :type c: str
+
+    :rtype: set
+
+    Example usage:
+
+    .. code: python
+
+      >>> case_variants('k')
+      {'k', 'K', '\u212a'}
+
+    """
+    return set(_case_table().get(c, (c,)))
+
+
+def _case_table():
+    """Return the dictionary from every cased character to the frozenset
+    of the characters equal to it when the case is ignored."""
+    global _case_classes
+    table = _case_classes
+    if table is None:
+        with _case_classes_lock:
+            if _case_classes is None:
+                classes = {}
+                # There are no cased characters past the supplementary
+                # multilingual plane.
+                for i in range(0x20000):
+                    char = chr(i)
+                    folded = simple_fold(char)
+                    if folded != char:
+                        classes.setdefault(folded, {folded}).add(char)
+                table = {}
+                for chars in classes.values():
+                    chars = frozenset(chars)
+                    for char in chars:
+                        table[char] = chars
+                _case_classes = table
+            table = _case_classes
+    return table
+
+
+def fold_case(token):
+    """Turn a character token into the one matching the same characters
+    regardless of their case. Dots and characters without case variants
+    are returned as is.
+
+    :param token: A character or a range token.
+    :type token: :py:class:`~Character`
+
+    :rtype: :py:class:`~Character`
+
+    """
+    if isinstance(token, Range):
+        folded = Range(token.caret)
+        folded.chars.update(token.chars)
+        # A single lookup per character, most of them have no variants.
+        for variants in map(_case_table().get, token.chars):
+            if variants is not None:
+                folded.chars.update(variants)
+        return folded
+    if token.dot:
+        return token
+    variants = case_variants(token.c)
+    if len(variants) == 1:
+        return token
+    folded = Range(token.caret)
+    for variant in variants:
+        folded.add_char(variant)
+    return folded
+
+
+def split_anchors(pattern):
+    """Strip the explicit start and end line symbols from a regular
+    expression.
+
+    :param pattern: A regular expression.
+    :type pattern: str
+
+    :returns: A tuple of the regular expression without the anchors and two
+      flags telling whether the start and the end anchors were there.
+    :rtype: tuple
+
+    Example usage:
+
+    .. code: python
+
+      >>> split_anchors('^abc')
+      ('abc', True, False)
+
+    """
+    start = pattern.startswith('^')
+    if start:
+        pattern = pattern[1:]
+    end = pattern.endswith('$')
+    if end:
+        pattern = pattern[:-1]
+    return pattern, start, end
+
+
 def add_anchors(pattern):
     """If there's no explicit start and end line symbols it is necessary to
     add the corresponding regexes to the beggining and end of the string.
@@ -169,32 +306,56 @@ def add_anchors(pattern):
     :type pattern: str
 
     """
+    pattern, start, end = split_anchors(pattern)
     # Start line.
-    pattern = pattern[1:] if pattern.startswith('^') else '.*' + pattern
+    pattern = pattern if start else '.*' + pattern
     # End line.
-    pattern = pattern[:-1] if pattern.endswith('$') else pattern + '.*'
+    pattern = pattern if end else pattern + '.*'
 
     return pattern
 
 
-def to_postfix(pattern):
+def to_postfix(pattern, anchors=True, ignorecase=False, max_length=None):
     """Transform a regular expression to the postfix form.
 
     :param pattern: A regular expression.
     :type pattern: str
 
+    :param anchors: Whether to apply :py:func:`~add_anchors` first. If it's
+      False, the pattern is transformed as is.
+    :type anchors: bool
+
+    :param ignorecase: Whether the character tokens should match
+      the characters regardless of their case. See :py:func:`~fold_case`.
+    :type ignorecase: bool
+
+    :param max_length: The maximum length of the regular expression with
+      the characters of its square brackets expressions counted one by one,
+      e.g. ``[a-z]`` adds 26 characters.
+    :type max_length: int
+
     :returns: A list of postfix form tokens for the given regular expression.
     :rtype: list
 
     :raises: :py:class:`~MalformedRegex` if the regular expression
       is malformed.
 
-    """
-    pattern = add_anchors(pattern)
-    return _to_postfix(pattern)
-
+    :raises: :py:class:`~regex.exceptions.LimitExceeded` if the regular
+      expression is longer than ``max_length``.
 
-def _to_postfix(pattern):
+    """
+    if max_length is not None and len(pattern) > max_length:
+        raise LimitExceeded(
+            'The regular expression is longer than %d characters'
+            % max_length)
+    budget = None if max_length is None else max_length - len(pattern)
+    if anchors:
+        pattern = add_anchors(pattern)
+    return _to_postfix(pattern, ignorecase, budget)
+
+
+def _to_postfix(pattern, ignorecase=False, budget=None):
+    # The budget is the number of the square brackets characters left.
     stack = []
     natoms = 0
     in_paren = False
@@ -213,7 +374,14 @@ def _to_postfix(pattern):
                 raise MalformedRegex(
                     'Backslashes are not allowed in square brackets.')
             elif c == ']':
-                range_ = make_range(range_buf)
+                range_ = make_range(range_buf, budget)
+                if ignorecase:
+                    range_ = fold_case(range_)
+                if budget is not None:
+                    budget -= len(range_.chars)
+                    if budget < 0:
+                        raise LimitExceeded(
+                            'The character classes are too large')
                 if natoms > 1:
                     stack.append(Concatenation)
                     natoms -= 1
@@ -237,7 +405,9 @@ def _to_postfix(pattern):
                 if natoms > 1:
                     stack.append(Concatenation)
                     natoms -= 1
-                stack.append(Character(c, caret))
+                character = Character(c, caret)
+                stack.append(fold_case(character) if ignorecase
+                             else character)
                 caret = False
                 natoms += 1
             escape = False
@@ -277,7 +447,7 @@ def _to_postfix(pattern):
                 buf.append(')')
                 continue
             in_paren = False
-            expr = _to_postfix(''.join(buf))
+            expr = _to_postfix(''.join(buf), ignorecase)
             if expr is None:
                 # Incorrect expression in parenthesis,
                 # nothing we can do.
@@ -297,7 +467,7 @@ def _to_postfix(pattern):
                 stack.append(Concatenation)
                 natoms -= 1
             character = Character(c, caret, c == '.')
-            stack.append(character)
+            stack.append(fold_case(character) if ignorecase else character)
             caret = False
             natoms += 1
 
@@ -307,3 +477,72 @@ def _to_postfix(pattern):
         stack.append(Disjunction)
         nalt -= 1
     return stack
+
+
+# Mark the "." and ".*" subexpressions in literal_alternatives.
+_DOT = object()
+_ANY = object()
+
+
+def literal_alternatives(postfix):
+    """Detect a regular expression that is an alternation of literal words,
+    each of them optionally surrounded by ``.*``.
+
+    :param postfix: The postfix form of a regular expression, the output of
+      :py:func:`~to_postfix`.
+    :type postfix: list
+
+    :returns: A list of ``(word, start, end)`` tuples, one per alternative.
+      ``start`` and ``end`` tell whether the word must be at the start or
+      at the end of the string, i.e. it isn't preceded or followed by
+      ``.*``. None if the expression isn't a literal alternation.
+    :rtype: list
+
+    Example usage:
+
+    .. code: python
+
+      >>> literal_alternatives(to_postfix('(foo|bar)$'))
+      [('foo', False, True), ('bar', False, True)]
+
+    """
+    stack = []
+    for token in postfix:
+        if isinstance(token, Range):
+            return None
+        elif isinstance(token, Character):
+            if token.caret:
+                return None
+            stack.append(_DOT if token.dot else [(True, token.c, True)])
+        elif isinstance(token, Operator):
+            if token.op != '*' or stack[-1] not in (_DOT, _ANY):
+                return None
+            stack[-1] = _ANY
+        elif token is Concatenation:
+            right = stack.pop()
+            left = stack.pop()
+            if left is _DOT or right is _DOT:
+                return None
+            elif left is _ANY and right is _ANY:
+                stack.append(_ANY)
+            elif left is _ANY:
+                stack.append([(False, word, end) for _, word, end in right])
+            elif right is _ANY:
+                stack.append([(start, word, False)
+                              for start, word, _ in left])
+            elif len(left) == 1 and len(right) == 1 and left[0][2] \
+                    and right[0][0]:
+                start, word_1, _ = left[0]
+                _, word_2, end = right[0]
+                stack.append([(start, word_1 + word_2, end)])
+            else:
+                return None
+        elif token is Disjunction:
+            right = stack.pop()
+            left = stack.pop()
+            if left in (_DOT, _ANY) or right in (_DOT, _ANY):
+                return None
+            stack.append(left + right)
+    if len(stack) != 1 or stack[0] in (_DOT, _ANY):
+        return None
+    return [(word, start, end) for start, word, end in stack[0]]
@@ -0,0 +1,124 @@
+"""Matching columns of strings with NumPy.
+
+The strings of a batch are encoded as a padded matrix of the DFA character
+classes, one column per string. Then the DFA states of all the strings are
+advanced at once, one row of the matrix at a time, by fancy indexing into
+the transition table. The padding has its own character class that keeps
+every state as is.
+
+NumPy is optional. Without it, or if the pattern's DFA is too large,
+the strings are matched one by one.
+"""
+from __future__ import absolute_import, print_function
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+from .pattern import Pattern, compile
+
+
+def _tables(dfa):
+    nstates = len(dfa.table)
+    width = dfa.nclasses + 1
+    table = numpy.empty((nstates, width), dtype=numpy.intp)
+    table[:, :-1] = dfa.table
+    # The padding class.
+    table[:, -1] = numpy.arange(nstates)
+    # The states are replaced with their row offsets in the flat table, so
+    # a step is a single lookup of the state plus the class.
+    table *= width
+    accepting = numpy.zeros(nstates * width, dtype=bool)
+    accepting[::width] = dfa.accepting
+    return table.ravel(), accepting
+
+
+def _class_lookup(dfa, max_code):
+    lookup = numpy.zeros(max_code + 1,
+                         dtype=numpy.min_scalar_type(dfa.nclasses))
+    for c, class_id in dfa.classes.items():
+        if ord(c) <= max_code:
+            lookup[ord(c)] = class_id
+    # The strings are padded with NUL characters, they get the padding
+    # class. The NUL characters inside the strings are fixed afterwards.
+    lookup[0] = dfa.nclasses
+    return lookup
+
+
+def _encode(strings):
+    chars = numpy.asarray(strings, dtype=str)
+    # NumPy strips trailing NUL characters, so the lengths are taken from
+    # the strings themselves.
+    lengths = numpy.fromiter(map(len, strings), dtype=numpy.intp,
+                             count=len(strings))
+    return chars, lengths
+
+
+def _match_batch(dfa, table, accepting, chars, lengths):
+    n = len(chars)
+    states = numpy.zeros(n, dtype=numpy.intp)
+    longest = int(lengths.max()) if n else 0
+    if longest == 0:
+        return accepting[states]
+    # The characters are read straight from the buffer of the array, the
+    # columns past the longest string of the batch are left out.
+    width = chars.dtype.itemsize // 4
+    codes = chars.view(numpy.uint32).reshape(n, width)[:, :longest].T
+    classes = _class_lookup(dfa, int(codes.max()))[codes]
+    nuls = codes == 0
+    if numpy.count_nonzero(nuls) > longest * n - int(lengths.sum()):
+        inside = numpy.arange(longest)[:, None] < lengths
+        classes[nuls & inside] = dfa.classes.get('\0', 0)
+    for row in classes:
+        states = table[states + row]
+    return accepting[states]
+
+
+def match_array(pattern, strings, batch_size=65536):
+    """Match every string of a sequence against a pattern.
+
+    :param pattern: A POSIX-like regular expression or a compiled pattern.
+    :type pattern: str or :py:class:`~regex.pattern.Pattern`
+
+    :param strings: Strings to match, e.g. a list or a NumPy array. A one
+      dimensional array of the ``U`` dtype is read without converting its
+      strings to Python objects, anything else is converted batch by batch.
+    :type strings: sequence
+
+    :param batch_size: How many strings to encode at once. Every batch is
+      a matrix of ``batch_size`` rows by the length of the longest string
+      in the batch.
+    :type batch_size: int
+
+    :returns: A boolean NumPy array with the match results, or a list of
+      booleans if NumPy isn't installed.
+
+    """
+    if not isinstance(pattern, Pattern):
+        pattern = compile(pattern)
+    dfa = pattern._determinized() if numpy is not None else False
+    if not dfa:
+        result = [pattern.match(s) for s in strings]
+        return result if numpy is None else numpy.array(result, dtype=bool)
+    table, accepting = _tables(dfa)
+    if isinstance(strings, numpy.ndarray) and strings.dtype.kind == 'U' \
+            and strings.ndim == 1:
+        # Native byte order and a contiguous buffer, copied only if needed.
+        chars = numpy.ascontiguousarray(
+            strings, dtype=strings.dtype.newbyteorder('='))
+        # NumPy doesn't keep the trailing NUL characters of its strings.
+        lengths = numpy.char.str_len(chars)
+        batches = ((chars[i:i + batch_size], lengths[i:i + batch_size])
+                   for i in range(0, len(chars), batch_size))
+    else:
+        strings = list(strings)
+        batches = (_encode(strings[i:i + batch_size])
+                   for i in range(0, len(strings), batch_size))
+    result = numpy.empty(len(strings), dtype=bool)
+    i = 0
+    for batch, batch_lengths in batches:
+        result[i:i + len(batch)] = _match_batch(
+            dfa, table, accepting, batch, batch_lengths)
+        i += len(batch)
+    return result
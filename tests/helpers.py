@@ -0,0 +1,28 @@
+"""Patterns and strings the matching backends are checked against the NFA
+simulation with."""
+from regex.executor import match as nfa_match
+
+
+PATTERNS = [
+    'abc', '^abc$', 'abc$', '^(ab|c)+[0-9]$', '[^a-z]+', '^^a.b',
+    '^(a|b)*abb$', 'x?y?z', '^.*$', '^a^.$', '^фы+$',
+]
+
+STRINGS = [
+    '', 'abc', 'xabcx', 'abab1', 'cc9', 'ABC', 'aab', 'babb', 'z', 'xyz',
+    'a\nb', 'abcab', 'фыы', 'фa', 'ы', 'фabc', 'ab\x00', 'abc\x00',
+    '\x00',
+]
+
+
+def nfa_results(pattern, strings=STRINGS):
+    return [nfa_match(pattern, s) for s in strings]
+
+
+def assert_agrees_with_nfa(matcher_for, patterns=PATTERNS, strings=STRINGS):
+    """Check that the matching functions returned by ``matcher_for`` for
+    the patterns give the same results as the NFA simulation."""
+    for pattern in patterns:
+        match = matcher_for(pattern)
+        for s in strings:
+            assert match(s) == nfa_match(pattern, s), (pattern, s)
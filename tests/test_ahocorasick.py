@@ -0,0 +1,99 @@
+import random
+
+import pytest
+
+from regex import Pattern, compile
+from regex.ahocorasick import Automaton
+from regex.executor import match as nfa_match
+
+UNMENTIONED = ''.join(chr(code) for code in range(0x400, 0x500))
+
+
+def test_occurrences():
+    automaton = Automaton(['he', 'she', 'hers', 'his'])
+    assert list(automaton.occurrences('ushers')) == [(1, 4), (0, 4), (2, 6)]
+    assert list(automaton.occurrences('ahishers', 1, 5)) == [(3, 4)]
+    assert list(automaton.occurrences('xyz')) == []
+
+
+def test_occurrences_agree_with_find():
+    random.seed(7)
+    for _ in range(200):
+        words = [''.join(random.choice('ab') for _ in range(
+            random.randint(1, 4))) for _ in range(random.randint(1, 6))]
+        s = ''.join(random.choice('ab') for _ in range(20))
+        expected = sorted(
+            (end, -len(words[index]), index)
+            for index in range(len(words))
+            for end in range(len(s) + 1)
+            if s[:end].endswith(words[index]))
+        found = [(end, -len(words[index]), index)
+                 for index, end in Automaton(words).occurrences(s)]
+        assert found == expected
+
+
+def test_transitions_cache_is_bounded():
+    s = 'abcd' * 10 + 'xyzuvw' * 10
+    automaton = Automaton(['abc', 'bcd'], max_cached=10)
+    found = list(automaton.occurrences(s))
+    assert found == list(Automaton(['abc', 'bcd']).occurrences(s))
+    assert automaton._cached <= 10
+    assert sum(map(len, automaton._next)) <= 10 + len(automaton) - 1
+
+
+def test_memory_usage_counts_the_cache():
+    automaton = Automaton(['word%d' % i for i in range(100)])
+    size = automaton.memory_usage()
+    list(automaton.occurrences(UNMENTIONED))
+    assert automaton.memory_usage() > size
+
+
+def test_stats_count_the_automaton():
+    pattern = Pattern('(%s)' % '|'.join('word%d' % i for i in range(100)))
+    stats = pattern.stats()
+    assert stats['literal_bytes'] > 0
+    pattern.match_alternative(UNMENTIONED)
+    after_match = pattern.stats()
+    assert after_match['literal_bytes'] > stats['literal_bytes']
+    assert after_match['total_bytes'] == pattern.memory_usage()
+    assert Pattern('^a+$').stats()['literal_bytes'] == 0
+
+
+def test_match_alternative():
+    pattern = compile('^(GET|POST|PUT)')
+    assert pattern.alternatives == ('GET', 'POST', 'PUT')
+    assert pattern.match_alternative('POST /api') == (1, 0, 4)
+    assert pattern.match_alternative('/POST') is None
+    pattern = compile('(foo|bar|oba)')
+    assert pattern.match_alternative('xfobarx') == (2, 2, 5)
+    assert pattern.match_alternative('xfobox') is None
+
+
+def test_match_uses_the_dfa():
+    pattern = Pattern('(%s)' % '|'.join('word%d' % i for i in range(100)))
+    size = pattern.stats()['literal_bytes']
+    assert pattern.match('a word42 b')
+    assert pattern.stats()['literal_bytes'] == size
+    assert pattern.stats()['dfa_states'] > 1
+
+
+def test_match_alternative_not_literal():
+    assert compile('^a+$').alternatives is None
+    with pytest.raises(ValueError):
+        compile('^a+$').match_alternative('aa')
+
+
+def test_literal_patterns_agree_with_nfa():
+    random.seed(42)
+    for _ in range(500):
+        words = [''.join(random.choice('abc') for _ in range(
+            random.randint(1, 4))) for _ in range(random.randint(1, 5))]
+        pattern = random.choice(['%s', '^(%s)', '(%s)$', '^(%s)$']) \
+            % '|'.join(words)
+        compiled = compile(pattern)
+        assert compiled.alternatives is not None
+        for _ in range(10):
+            s = ''.join(random.choice('abcd')
+                        for _ in range(random.randint(0, 10)))
+            found = compiled.match_alternative(s)
+            assert (found is not None) == nfa_match(pattern, s)
@@ -0,0 +1,113 @@
+import time
+
+import pytest
+
+from regex import CODEGEN, IGNORECASE, compile
+from regex.codegen import SHORT, build, required_literals
+from regex.dfa import DFA
+from regex.exceptions import LimitExceeded
+
+from tests.helpers import assert_agrees_with_nfa
+
+
+def dfa_for(pattern):
+    return DFA(compile(pattern)._dfa.program)
+
+
+def test_dfa_agrees_with_nfa():
+    assert_agrees_with_nfa(lambda pattern: dfa_for(pattern).match)
+
+
+def test_dfa_character_classes():
+    dfa = dfa_for('^[a-c]+x$')
+    # Class 0 for other characters, one for a-c and one for x.
+    assert dfa.nclasses == 3
+    assert dfa.classes['a'] == dfa.classes['c'] != dfa.classes['x']
+    assert 'd' not in dfa.classes
+
+
+def test_dfa_max_states():
+    with pytest.raises(LimitExceeded):
+        DFA(compile('(a|b)*a(a|b)(a|b)(a|b)(a|b)(a|b)$')._dfa.program,
+            max_states=16)
+
+
+def test_generated_function_agrees_with_nfa():
+    assert_agrees_with_nfa(lambda pattern: build(dfa_for(pattern)))
+
+
+def test_generated_source():
+    function = build(dfa_for('^ab'))
+    assert "s0.update({'a': s2})" in function.source
+    assert 'def match(s, backward=False' in function.source
+    assert function('abz')
+    assert not function('ba')
+
+
+def test_required_literals():
+    assert required_literals(dfa_for('error|failure')) == \
+        ('error', 'failure')
+    assert required_literals(dfa_for('fox.*dog')) == ('dog',)
+    assert required_literals(dfa_for('(ab|cb)x')) == ('bx',)
+    assert required_literals(dfa_for('^[a-z]+$')) == ()
+    assert required_literals(dfa_for('a*')) == ()
+    assert "if not ('error' in s or 'failure' in s):" in \
+        build(dfa_for('error|failure')).source
+
+
+def test_generated_function_skips():
+    # Long runs are skipped with the string methods, short ones cached.
+    cases = [
+        ('foo', 'x' * 5000 + 'foo'),
+        ('foo', 'x' * 5000 + 'fo' + 'x' * 5000),
+        ('foo|bar$', 'ff' * 3000 + 'bar'),
+        ('^[a-c]*$', 'abc' * 2000),
+        ('^[a-c]*$', 'abc' * 2000 + 'd'),
+        ('^[a-c]*d$', 'a' * (SHORT - 1) + 'b' * 3000 + 'd'),
+        ('(a|b)*c$', 'ab' * 3000 + 'c'),
+        ('(a|b)*c$', 'ab' * 3000 + 'cd'),
+        ('^x[^y]*y', 'x' + 'z' * 3000 + 'y' + 'z' * 3000),
+        ('^x[^y]*y', 'x' + 'z' * 3000),
+    ]
+    for pattern, s in cases:
+        expected = compile(pattern).match(s)
+        function = build(dfa_for(pattern))
+        for backward in (False, True):
+            for _ in range(2):
+                assert function(s[::-1] if backward else s,
+                                backward) == expected, (pattern, s[:10])
+        assert compile(pattern, CODEGEN).match(s) == expected
+
+
+def best_time(function, strings):
+    times = []
+    for _ in range(3):
+        began = time.perf_counter()
+        for s in strings:
+            function(s)
+        times.append(time.perf_counter() - began)
+    return min(times)
+
+
+def test_codegen_is_faster_on_long_strings():
+    lines = ['connection reset by the remote peer ' * 30] * 200
+    for pattern in ('timeout|refused', '^[a-z ]*$', 'remote.*timeout'):
+        lazy = compile(pattern).match
+        generated = compile(pattern, CODEGEN).match
+        assert [lazy(s) for s in lines] == [generated(s) for s in lines]
+        assert best_time(generated, lines) * 2 < best_time(lazy, lines), \
+            pattern
+
+
+def test_codegen_flag():
+    assert_agrees_with_nfa(lambda pattern: compile(pattern, CODEGEN).match)
+
+
+def test_codegen_flag_with_ignorecase():
+    assert compile('^abc$', CODEGEN | IGNORECASE).match('AbC')
+
+
+def test_codegen_falls_back_for_large_dfa():
+    pattern = compile('(a|b)*a' + '(a|b)' * 12 + '$', CODEGEN)
+    assert pattern.match('a' + 'b' * 12)
+    assert not pattern.match('b' * 13)
@@ -2,8 +2,12 @@ import string
 
 import pytest
 
-from regex import match
+from regex import compile, match
+from regex.compiler import compile as compile_nfa
 from regex.exceptions import MalformedRegex
+from regex.executor import Program, match as nfa_match
+from regex.optimizer import optimize
+from regex.tokenizer import to_postfix
 
 
 def test_match_empty():
@@ -264,3 +268,19 @@ def test_metacharacters_pipe():
     assert match('abc|def', 'def')
     assert match('(abc)|(def)', 'abc')
     assert not match('^(abc)|(def)$', 'defabc')
+
+
+def test_program_agrees_with_dfa():
+    patterns = ['(ab|c)+d', '^[^a-z]+$', 'a.c', '^(a|b)*abb$', 'x?y?z']
+    strings = ['', 'abcd', 'ABC', 'abc', 'aabb', 'babb', 'z', 'xyz', 'cd']
+    for pattern in patterns:
+        for s in strings:
+            assert nfa_match(pattern, s) == compile(pattern).match(s)
+
+
+def test_program_start_closure():
+    program = Program(optimize(compile_nfa(to_postfix('^a*$'))).start)
+    assert len(program) == 2
+    assert program.match in program.start
+    assert program.step(program.start, 'a') == frozenset(program.start)
+    assert program.step(program.start, 'b') == frozenset()
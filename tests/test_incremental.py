@@ -0,0 +1,73 @@
+import random
+import time
+
+from regex import compile
+from regex.incremental import IncrementalMatcher
+
+
+def test_initial_match():
+    assert IncrementalMatcher('^[a-z ]+$', 'hello world').matched
+    assert not IncrementalMatcher('^[a-z ]+$', 'hello World').matched
+
+
+def test_edit():
+    matcher = IncrementalMatcher('^[a-z ]+$', 'hello world', interval=2)
+    assert not matcher.edit(5, 6, '!')
+    assert matcher.text == 'hello!world'
+    assert matcher.edit(5, 6, ' big ')
+    assert matcher.text == 'hello big world'
+    assert matcher.edit(0, 0, 'oh ')
+    assert matcher.edit(len(matcher.text), len(matcher.text), ' again')
+    assert matcher.text == 'oh hello big world again'
+    assert not matcher.edit(3, 3, '1')
+
+
+def test_random_edits_agree_with_full_match():
+    random.seed(42)
+    for pattern in ['^(ab|c)*$', 'abc', '(a|b)c$', '^[^x]*$']:
+        compiled = compile(pattern)
+        text = ''.join(random.choice('abcx') for _ in range(200))
+        matcher = IncrementalMatcher(compiled, text, interval=16)
+        for _ in range(200):
+            start = random.randint(0, len(matcher.text))
+            end = random.randint(start, min(start + 5, len(matcher.text)))
+            replacement = ''.join(
+                random.choice('abcx') for _ in range(random.randint(0, 5)))
+            text = text[:start] + replacement + text[end:]
+            assert matcher.edit(start, end, replacement) == \
+                compiled.match(text)
+            assert matcher.text == text
+
+
+def test_edit_cost_is_proportional_to_the_edit():
+    text = 'ab' * 100000
+    matcher = IncrementalMatcher('^(ab)*$', text, interval=100)
+    assert matcher.matched
+    assert matcher.scanned == len(text)
+    assert matcher.edit(100000, 100002, 'abab')
+    assert matcher.scanned <= 300
+    assert not matcher.edit(50000, 50001, 'b')
+    assert matcher.scanned <= 300
+
+
+def edit_time(size):
+    matcher = IncrementalMatcher('^[a-z ]+$', 'a' * size, interval=1000)
+    best = float('inf')
+    for i in range(20):
+        began = time.perf_counter()
+        matcher.edit(5000 + i, 5001 + i, 'bc')
+        best = min(best, time.perf_counter() - began)
+    return best
+
+
+def test_edit_time_does_not_depend_on_text_length():
+    assert edit_time(4 * 10 ** 6) < 5 * edit_time(10 ** 4)
+
+
+def test_positions_are_shifted_lazily():
+    matcher = IncrementalMatcher('^[a-z ]+$', 'a' * 10000, interval=100)
+    positions = list(matcher._positions)
+    matcher.edit(150, 151, '')
+    matcher.edit(160, 161, '')
+    assert matcher._positions[10:] == positions[10:]
+    assert matcher._position(99) == 9898
@@ -0,0 +1,82 @@
+import random
+
+from regex.compiler import State, SplitState, Match, compile
+from regex.exceptions import MalformedRegex
+from regex.executor import Program
+from regex.optimizer import optimize, count_states, reachable
+from regex.tokenizer import to_postfix
+
+
+def optimized(pattern):
+    return optimize(compile(to_postfix(pattern)))
+
+
+def test_counts_are_reported():
+    result = optimized('^foo|foobar|food$')
+    assert result.states_before == count_states(
+        compile(to_postfix('^foo|foobar|food$')))
+    assert result.states_after == count_states(result.start)
+    assert result.states_after < result.states_before
+
+
+def test_common_prefix_is_factored():
+    result = optimized('^foo|foobar|food$')
+    # f -> o -> o -> (Match | b -> a -> r | d)
+    assert result.states_after == 8
+    state = result.start
+    for c in 'foo':
+        assert isinstance(state, State) and state.c == c
+        state = state.outs[0]
+    assert isinstance(state, SplitState)
+    assert len(state.outs) == 3
+    assert Match in state.outs
+
+
+def test_no_split_chains():
+    result = optimized('(a|b|c|d)+')
+    for state in reachable(result.start):
+        if isinstance(state, SplitState):
+            assert not any(isinstance(out, SplitState) for out in state.outs)
+
+
+def test_dead_states_are_dropped():
+    result = optimized('^a^.b$')
+    assert result.states_after == 1
+    assert list(result.start.outs) == []
+
+
+def test_original_graph_is_untouched():
+    start = compile(to_postfix('^ab|ac$'))
+    before = count_states(start)
+    optimize(start)
+    assert count_states(start) == before
+
+
+def test_state_count_never_grows():
+    patterns = ['(a|b)*a' + '(a|b)' * 12, '(a|b)*abb', '^(ab|ac)*(ab|ad)$',
+                '(a*|b)*(a|ab)+', '^(x|xy|xyz)(x|xy)*$']
+    for pattern in patterns:
+        result = optimized(pattern)
+        assert result.states_after <= result.states_before
+
+
+def test_random_patterns_agree_with_unoptimized():
+    random.seed(26)
+    for _ in range(300):
+        pattern = ''.join(random.choice(['a', 'b', 'ab', '|', '*', '(a|b)'])
+                          for _ in range(random.randint(1, 8)))
+        try:
+            postfix = to_postfix(pattern)
+        except MalformedRegex:
+            continue
+        start = compile(postfix)
+        if start is None:
+            continue
+        result = optimize(start)
+        assert result.states_after <= result.states_before
+        program = Program(start)
+        optimized_program = Program(result.start)
+        for _ in range(10):
+            s = ''.join(random.choice('ab')
+                        for _ in range(random.randint(0, 8)))
+            assert optimized_program.run(s) == program.run(s)
@@ -0,0 +1,264 @@
+import time
+
+import pytest
+
+from regex import CODEGEN, IGNORECASE, Pattern, cache_memory_usage, \
+    cache_stats, compile, match, match_many, purge
+from regex.exceptions import LimitExceeded, MalformedRegex
+from regex.executor import match as nfa_match
+import regex.pattern as pattern_module
+
+
+def test_compile_returns_pattern():
+    pattern = compile('ab+c')
+    assert isinstance(pattern, Pattern)
+    assert pattern.match('abbbc')
+    assert not pattern.match('ac')
+
+
+def test_compile_is_cached():
+    purge()
+    assert compile('a|b') is compile('a|b')
+
+
+def test_compile_malformed():
+    with pytest.raises(MalformedRegex):
+        compile('+')
+
+
+def test_pattern_is_immutable():
+    pattern = compile('abc')
+    with pytest.raises(AttributeError):
+        pattern.pattern = 'def'
+    with pytest.raises(AttributeError):
+        pattern.foo = 42
+    with pytest.raises(AttributeError):
+        del pattern.nfa
+
+
+def test_match_accepts_compiled_pattern():
+    assert match(compile('^[a-c]+$'), 'abcabc')
+    assert not match(compile('^[a-c]+$'), 'abcabcd')
+
+
+def test_match_many():
+    strings = ['abc', 'abd', 'xabcx', 'ab', ''] * 100
+    expected = [match('abc', s) for s in strings]
+    assert match_many('abc', strings) == expected
+    assert match_many('abc', strings, threads=4) == expected
+
+
+def test_match_many_shares_dfa_cache_between_threads():
+    pattern = Pattern('^(ab|cd)*[0-9]+$')
+    strings = ['abcd%d' % i for i in range(1000)] + ['abc1'] * 10
+    result = match_many(pattern, strings, threads=8)
+    assert result == [True] * 1000 + [False] * 10
+
+
+def test_end_anchored_match_agrees_with_nfa():
+    patterns = ['abc$', 'a|bc$', '(ab|c)+$', '[a-c]*d$', 'a.+$', '^^a$']
+    strings = ['', 'abc', 'xabc', 'abcx', 'ab', 'cabd', 'd', 'bc', 'ax', 'b']
+    for pattern in patterns:
+        compiled = compile(pattern)
+        for s in strings:
+            assert compiled.match(s) == nfa_match(pattern, s), (pattern, s)
+
+
+def test_end_anchored_match_stops_at_suffix():
+    pattern = compile('abc$')
+    assert pattern.match('x' * 100000 + 'abc')
+    assert not pattern.match('x' * 100000 + 'abd')
+
+
+def test_search():
+    assert compile('b+c').search('abbbcd') == (1, 5)
+    assert compile('b+c').search('abd') is None
+    assert compile('^ab').search('abc') == (0, 2)
+    assert compile('^ab').search('cab') is None
+    assert compile('b+$').search('abb') == (1, 3)
+    assert compile('b+$').search('bba') is None
+    assert compile('^b+$').search('bbb') == (0, 3)
+    assert compile('(ab|b)c').search('xxabcabc') == (2, 5)
+
+
+def test_search_empty_pattern():
+    assert compile('').search('abc') == (0, 0)
+    assert compile('$').search('abc') == (3, 3)
+    assert compile('^$').search('') == (0, 0)
+    assert compile('^$').search('abc') is None
+
+
+def test_ignorecase():
+    pattern = compile('^hello [a-c]+$', IGNORECASE)
+    assert pattern.match('HeLLo AbC')
+    assert not pattern.match('HeLLo AbD')
+    assert not compile('^hello$').match('HELLO')
+
+
+def test_ignorecase_caret():
+    pattern = compile('^^a[^b]$', IGNORECASE)
+    assert pattern.match('cc')
+    assert not pattern.match('Ac')
+    assert not pattern.match('cB')
+
+
+def test_ignorecase_unicode_simple_folding():
+    assert match('^k$', 'K', IGNORECASE)
+    assert match('^straße$', 'STRAẞE', IGNORECASE)
+    assert match('^σ+$', 'Σσς', IGNORECASE)
+    assert not match('^ß$', 'ss', IGNORECASE)
+
+
+def test_ignorecase_search_and_end_anchored_match():
+    pattern = compile('b+c$', IGNORECASE)
+    assert pattern.match('xxBbC')
+    assert pattern.search('aBbC') == (1, 4)
+
+
+def test_ignorecase_is_cached_separately():
+    assert compile('a') is not compile('a', IGNORECASE)
+    assert compile('a', IGNORECASE).flags == IGNORECASE
+
+
+def test_max_length():
+    with pytest.raises(LimitExceeded):
+        compile('a' * 101, max_length=100)
+    assert compile('a' * 100, max_length=100).match('a' * 100)
+
+
+def test_max_length_counts_character_classes():
+    began = time.monotonic()
+    with pytest.raises(LimitExceeded):
+        compile('[\x00-\U0010ffff]', max_length=10, max_states=10)
+    with pytest.raises(LimitExceeded):
+        compile('[\x00-\U0010ffff]', IGNORECASE, max_length=10)
+    assert time.monotonic() - began < 1
+    with pytest.raises(LimitExceeded):
+        compile('^[a-z]$', max_length=30)
+    assert compile('^[a-z]$', max_length=40).match('q')
+    with pytest.raises(LimitExceeded):
+        compile('^[a-z]$', max_length=30)
+
+
+def test_max_states():
+    with pytest.raises(LimitExceeded):
+        Pattern('^(abc|def|ghi)+$', max_states=5)
+    compile('^(abc|def|ghi)+$')
+    with pytest.raises(LimitExceeded):
+        compile('^(abc|def|ghi)+$', max_states=5)
+
+
+def test_max_states_do_not_limit_derived_automata():
+    purge()
+    assert compile('a?$', max_states=3).states_after == 3
+    assert match('a?$', 'xa')
+    assert compile('a?$').search('xa') == (1, 2)
+    purge()
+
+
+def test_limits_are_not_malformed_regex():
+    assert not issubclass(LimitExceeded, MalformedRegex)
+
+
+def test_max_steps():
+    pattern = compile('^a+$')
+    assert pattern.match('a' * 10000, max_steps=10000)
+    with pytest.raises(LimitExceeded):
+        pattern.match('a' * 10001, max_steps=10000)
+    with pytest.raises(LimitExceeded):
+        match('^a+$', 'a' * 10001, max_steps=10000)
+
+
+def test_max_steps_stops_early():
+    # The result is known after the first characters.
+    assert compile('abc').match('abc' + 'x' * 100000, max_steps=10)
+    assert not compile('^abc').match('abd' + 'x' * 100000, max_steps=10)
+    assert compile('abc$').match('x' * 100000 + 'abc', max_steps=10)
+
+
+def test_timeout():
+    pattern = compile('^(a|b)*c$')
+    with pytest.raises(LimitExceeded):
+        pattern.match('ab' * 1000000, timeout=0)
+    assert not pattern.match('ab' * 10, timeout=10)
+
+
+def test_scan_lines():
+    pattern = compile('^b')
+    assert pattern.scan_lines('abc\nbcd\nbar\n') == [2, 3]
+    assert pattern.scan_lines('abc\nbcd\nbar', offsets=True) == [4, 8]
+    assert pattern.scan_lines(b'abc\nbcd\nbar') == [2, 3]
+    assert pattern.scan_lines('') == []
+    assert pattern.scan_lines(b'') == []
+
+
+def test_scan_lines_bytes_offsets():
+    buffer = 'фыв\nbar\nы\nbaz'.encode('utf-8')
+    offsets = compile('^b').scan_lines(buffer, offsets=True)
+    assert offsets == [7, 14]
+    assert [buffer[offset:offset + 3] for offset in offsets] == \
+        [b'bar', b'baz']
+    assert compile('^b').scan_lines(buffer) == [2, 4]
+
+
+def test_scan_lines_bytes_blocks(monkeypatch):
+    monkeypatch.setattr(pattern_module, '_LINES_BLOCK', 3)
+    buffer = 'ыb\nbы\nbb\n'.encode('utf-8')
+    assert compile('^bы$').scan_lines(buffer) == [2]
+    assert compile('^b').scan_lines(buffer, offsets=True) == [4, 8]
+
+
+def test_scan_lines_anchors_per_line():
+    text = 'foo\nxfoo\nfoox\nfoo\n\n'
+    assert compile('^foo$').scan_lines(text) == [1, 4]
+    assert compile('foo$').scan_lines(text) == [1, 2, 4]
+    assert compile('^foo').scan_lines(text) == [1, 3, 4]
+    assert compile('^$').scan_lines(text) == []
+    assert compile('^a*$').scan_lines(text) == [5]
+
+
+def test_scan_lines_agrees_with_match():
+    lines = ['ab', 'abab', 'aba', '', 'ba', 'ababab', 'x']
+    pattern = compile('^(ab)+$')
+    expected = [i + 1 for i, line in enumerate(lines) if pattern.match(line)]
+    assert pattern.scan_lines('\n'.join(lines)) == expected
+
+
+def test_stats():
+    pattern = Pattern('^(ab|cd)+[0-9]$')
+    stats = pattern.stats()
+    assert stats['nfa_states'] == pattern.states_after
+    assert 0 < stats['split_states'] < stats['nfa_states']
+    assert stats['split_ratio'] == \
+        float(stats['split_states']) / stats['nfa_states']
+    assert stats['dfa_states'] == 1
+    assert stats['dfa_table_bytes'] == 0
+    assert stats['total_bytes'] == pattern.memory_usage()
+    pattern.match('abcd1')
+    after_match = pattern.stats()
+    assert after_match['dfa_states'] > stats['dfa_states']
+    assert after_match['dfa_cache_bytes'] > stats['dfa_cache_bytes']
+
+
+def test_stats_large_character_class():
+    small = Pattern('^[a-b]$').stats()
+    large = Pattern('^[a-zA-Z0-9]$').stats()
+    assert large['class_bytes'] > small['class_bytes']
+
+
+def test_stats_generated_code():
+    pattern = Pattern('^abc', CODEGEN)
+    pattern.match('abc')
+    assert pattern.stats()['dfa_table_bytes'] > 0
+
+
+def test_cache_stats():
+    purge()
+    assert cache_stats()['patterns'] == 0
+    assert cache_memory_usage() == 0
+    a = compile('abc')
+    b = compile('[a-z]+')
+    stats = cache_stats()
+    assert stats['patterns'] == 2
+    assert stats['total_bytes'] == a.memory_usage() + b.memory_usage()
+    assert cache_memory_usage() == stats['total_bytes']
@@ -0,0 +1,112 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import regex
+from regex import compile
+from regex.exceptions import LimitExceeded
+from regex.shared import SharedPattern, attach, dump, export, load, to_bytes
+
+from tests.helpers import PATTERNS, assert_agrees_with_nfa
+
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python < 3.8.
+    shared_memory = None
+
+needs_shared_memory = pytest.mark.skipif(
+    shared_memory is None, reason='multiprocessing.shared_memory is missing')
+
+
+def test_shared_pattern_agrees_with_nfa():
+    assert_agrees_with_nfa(
+        lambda pattern: SharedPattern(to_bytes(pattern)).match)
+    for pattern in PATTERNS:
+        assert SharedPattern(to_bytes(pattern)).pattern == pattern
+
+
+def test_shared_pattern_is_read_only():
+    shared = SharedPattern(bytearray(to_bytes('abc')))
+    with pytest.raises(TypeError):
+        shared._table[0] = 1
+
+
+def test_not_a_pattern_buffer():
+    with pytest.raises(ValueError):
+        SharedPattern(b'\x00' * 64)
+
+
+def test_too_large_dfa():
+    with pytest.raises(LimitExceeded):
+        to_bytes('(a|b)*a' + '(a|b)' * 12 + '$')
+    with pytest.raises(LimitExceeded):
+        to_bytes('^(abc|abd)$', max_states=3)
+
+
+def test_max_states(tmp_path):
+    # 200 hexadecimal words with few common prefixes.
+    words = ['%08x' % (i * 2654435761 % 2 ** 32) for i in range(200)]
+    pattern = compile('^(%s)$' % '|'.join(words))
+    with pytest.raises(LimitExceeded):
+        to_bytes(pattern)
+    shared = SharedPattern(to_bytes(pattern, max_states=10000))
+    assert all(shared.match(word) for word in words)
+    assert not shared.match('00000001')
+    path = str(tmp_path / 'pattern.bin')
+    dump(pattern, path, max_states=10000)
+    loaded = load(path)
+    assert loaded.match(words[-1])
+    loaded.close()
+
+
+@needs_shared_memory
+def test_export_attach():
+    block = export(compile('^(GET|POST) /api/'))
+    try:
+        pattern = attach(block.name)
+        assert pattern.match('GET /api/users')
+        assert not pattern.match('PUT /api/users')
+        pattern.close()
+    finally:
+        block.close()
+        block.unlink()
+
+
+_WORKER = """
+from regex.shared import attach
+pattern = attach(%r)
+assert pattern.match('GET /api/users')
+pattern.close()
+"""
+
+
+@needs_shared_memory
+def test_attach_from_worker_processes():
+    block = export(compile('^(GET|POST) /api/'))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [os.path.dirname(os.path.dirname(os.path.abspath(regex.__file__)))]
+        + sys.path)
+    try:
+        # A worker exiting must leave the block to the other workers.
+        for _ in range(2):
+            subprocess.run([sys.executable, '-c', _WORKER % block.name],
+                           env=env, check=True)
+        pattern = attach(block.name)
+        assert pattern.match('POST /api/users')
+        pattern.close()
+    finally:
+        block.close()
+        block.unlink()
+
+
+def test_dump_load(tmp_path):
+    path = str(tmp_path / 'pattern.bin')
+    dump('^[a-z]+@[a-z]+$', path)
+    pattern = load(path)
+    assert pattern.match('user@example')
+    assert not pattern.match('user@')
+    pattern.close()
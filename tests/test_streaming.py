@@ -0,0 +1,69 @@
+import asyncio
+
+from regex.streaming import iter_lines, match_stream
+
+
+def run_until_complete(coroutine):
+    # asyncio.run() is only available since Python 3.7.
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+async def chunks(*items):
+    for item in items:
+        yield item
+
+
+def make_reader(data):
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+async def collect(aiter):
+    return [item async for item in aiter]
+
+
+def test_iter_lines_stream_reader():
+    async def run():
+        reader = make_reader(b'foo\nbar\nfoobar\nbaz')
+        return await collect(iter_lines('^foo', reader, chunk_size=3))
+    assert run_until_complete(run()) == [(1, 'foo'), (3, 'foobar')]
+
+
+def test_iter_lines_split_across_chunks():
+    async def run():
+        source = chunks(b'ab', b'c\nx', b'yz\nab', b'c')
+        return await collect(iter_lines('^abc$', source))
+    assert run_until_complete(run()) == [(1, 'abc'), (3, 'abc')]
+
+
+def test_iter_lines_multibyte_characters_split_across_chunks():
+    data = 'фы\nф'.encode('utf-8')
+
+    async def run():
+        source = chunks(data[:1], data[1:])
+        return await collect(iter_lines('^ф', source))
+    assert run_until_complete(run()) == [(1, 'фы'), (2, 'ф')]
+
+
+def test_iter_lines_slices_and_executor():
+    lines = ['a' * 1000 + 'b', 'a' * 1000]
+    data = '\n'.join(lines).encode('utf-8')
+
+    async def run(**kwargs):
+        return await collect(iter_lines('^a+b$', make_reader(data), **kwargs))
+    assert run_until_complete(run(slice_size=7)) == [(1, lines[0])]
+    assert run_until_complete(run(executor_threshold=100)) == [(1, lines[0])]
+
+
+def test_match_stream():
+    async def run(pattern, *items):
+        return await match_stream(pattern, chunks(*items), slice_size=2)
+    assert run_until_complete(run('^(ab)+$', b'abab', b'ab'))
+    assert not run_until_complete(run('^(ab)+$', b'abab', b'a'))
+    assert run_until_complete(run('needle', 'hay' * 10, 'needle', 'hay'))
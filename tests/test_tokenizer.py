@@ -1,7 +1,11 @@
+import threading
+
 import pytest
 
+from regex import tokenizer
 from regex.tokenizer import to_postfix, Character, Concatenation, \
-    Disjunction, Operator, square_brackets_expand
+    Disjunction, Operator, Range, case_variants, square_brackets_expand, \
+    literal_alternatives, split_anchors, fold_case, make_range
 from regex.exceptions import MalformedRegex
 
 
@@ -143,3 +147,55 @@ def test_alt_with_groups():
     assert to_postfix('^(abc)|(cde)$') == as_list_of_tokens('ab.c.cd.e.|')
 
 # to_postfix tests end -------------------
+
+
+def test_split_anchors():
+    assert split_anchors('abc') == ('abc', False, False)
+    assert split_anchors('^abc') == ('abc', True, False)
+    assert split_anchors('abc$') == ('abc', False, True)
+    assert split_anchors('^abc$') == ('abc', True, True)
+    assert split_anchors('$') == ('', False, True)
+
+
+def test_case_variants():
+    assert case_variants('a') == {'a', 'A'}
+    assert case_variants('K') == {'k', 'K', 'K'}
+    assert case_variants('1') == {'1'}
+
+
+def test_case_table_built_once_by_concurrent_threads(monkeypatch):
+    monkeypatch.setattr(tokenizer, '_case_classes', None)
+    results = []
+
+    def fold():
+        results.append(case_variants('K'))
+
+    threads = [threading.Thread(target=fold) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [{'k', 'K', 'K'}] * 8
+
+
+def test_fold_case_range():
+    assert fold_case(make_range('a-c1')).chars == set('abcABC1')
+    assert fold_case(make_range('^k')).chars == {'k', 'K', 'K'}
+
+
+def test_to_postfix_ignorecase():
+    tokens = to_postfix('^a1$', ignorecase=True)
+    assert isinstance(tokens[0], Range)
+    assert tokens[0].chars == {'a', 'A'}
+    assert tokens[1] == Character('1')
+
+
+def test_literal_alternatives():
+    assert literal_alternatives(to_postfix('^(foo|bar)$')) == [
+        ('foo', True, True), ('bar', True, True)]
+    assert literal_alternatives(to_postfix('(foo|bar)$')) == [
+        ('foo', False, True), ('bar', False, True)]
+    assert literal_alternatives(to_postfix('a\\.c')) == [
+        ('a.c', False, False)]
+    for pattern in ['a.c', 'a.', 'a*', '[ab]c', '(foo|bar)baz', '^.*$']:
+        assert literal_alternatives(to_postfix(pattern)) is None
@@ -0,0 +1,60 @@
+import pytest
+
+from regex import compile
+from regex import vectorized
+from regex.vectorized import match_array
+
+from tests.helpers import PATTERNS, STRINGS, nfa_results
+
+
+def test_match_array_agrees_with_nfa():
+    numpy = pytest.importorskip('numpy')
+    for pattern in PATTERNS:
+        result = match_array(pattern, STRINGS, batch_size=4)
+        assert isinstance(result, numpy.ndarray)
+        assert result.dtype == bool
+        assert list(result) == nfa_results(pattern), pattern
+
+
+def test_match_array_empty():
+    pytest.importorskip('numpy')
+    assert len(match_array('abc', [])) == 0
+    assert list(match_array('^a*$', ['', ''])) == [True, True]
+
+
+def test_match_array_numpy_input():
+    numpy = pytest.importorskip('numpy')
+    strings = numpy.array(['abc', 'abd', 'xabc'])
+    assert list(match_array(compile('abc$'), strings)) == [True, False, True]
+
+
+def test_match_array_reads_unicode_arrays(monkeypatch):
+    numpy = pytest.importorskip('numpy')
+    expected = nfa_results('^(ab|c)+[0-9]')
+
+    def encode(strings):
+        raise AssertionError('The array was converted')
+
+    monkeypatch.setattr(vectorized, '_encode', encode)
+    strings = numpy.array(STRINGS)
+    swapped = strings.astype(strings.dtype.newbyteorder('S'))
+    strided = numpy.array([s for s in STRINGS for _ in range(2)])[::2]
+    for array in (strings, swapped, strided):
+        assert list(match_array('^(ab|c)+[0-9]', array, batch_size=4)) == \
+            expected
+
+
+def test_match_array_nul_characters():
+    numpy = pytest.importorskip('numpy')
+    strings = ['a\0b', 'a\0', 'ab', '\0']
+    assert list(match_array('^a.b$', strings)) == [True, False, False, False]
+    assert list(match_array('^a\0?$', strings)) == \
+        [False, True, False, False]
+    # NumPy drops the trailing NUL characters of its strings.
+    assert list(match_array('^a\0?$', numpy.array(strings))) == \
+        [False, True, False, False]
+
+
+def test_match_array_without_numpy(monkeypatch):
+    monkeypatch.setattr(vectorized, 'numpy', None)
+    assert match_array('^a+$', ['aa', 'ab', '']) == [True, False, False]